@@ -1,4 +1,4 @@
-import {useState} from "react";
+import {useEffect, useState} from "react";
 import {
     Admin, AppBar, AutocompleteInput,
     BooleanField, BooleanInput, BulkDeleteButton, Button, BulkExportButton, BulkUpdateButton,
@@ -6,8 +6,8 @@ import {
     Datagrid, DatagridConfigurable, DateField, DateInput, DateTimeInput, DeleteButton,
     Edit, EditButton, ExportButton,
     FilterButton, HttpError, InspectorButton,
-    Layout, List, ListButton,
-    NullableBooleanInput, NumberInput, NumberField,
+    Layout, List, ListButton, ListPaginationContext,
+    NullableBooleanInput, NumberInput, NumberField, Pagination,
     ReferenceField, ReferenceInput, ReferenceManyField, ReferenceOneField, Resource,
     SaveButton, SelectColumnsButton, SelectField, SelectInput, Show, ShowButton,
     SimpleForm, SimpleShowLayout,
@@ -16,13 +16,14 @@ import {
     downloadCSV, email, maxLength, maxValue, minLength, minValue, regex, required,
     useCreate, useCreatePath, useDataProvider, useDelete, useDeleteMany,
     useGetList, useGetMany, useGetOne, useGetRecordId,
-    useInfiniteGetList, useInput, useNotify,
-    useRecordContext, useRedirect, useRefresh, useResourceContext, useUnselect,
-    useUnselectAll, useUpdate, useUpdateMany,
+    useInfiniteGetList, useInput, useListContext, useListPaginationContext, useNotify,
+    useRecordContext, useRedirect, useRefresh, useResourceContext, useStore, useTranslate,
+    useUnselect, useUnselectAll, useUpdate, useUpdateMany,
 } from "react-admin";
 import {useFormContext} from "react-hook-form";
 import jsonExport from "jsonexport/dist";
 import VisibilityOffIcon from "@mui/icons-material/VisibilityOff";
+import {decode} from "./msgpack";
 
 window.ReactAdmin = {
     Admin, AppBar, AutocompleteInput,
@@ -31,8 +32,8 @@ window.ReactAdmin = {
     Datagrid, DatagridConfigurable, DateField, DateInput, DateTimeInput, DeleteButton,
     Edit, EditButton, ExportButton,
     FilterButton, HttpError, InspectorButton,
-    Layout, List, ListButton,
-    NullableBooleanInput, NumberInput, NumberField,
+    Layout, List, ListButton, ListPaginationContext,
+    NullableBooleanInput, NumberInput, NumberField, Pagination,
     ReferenceField, ReferenceInput, ReferenceManyField, ReferenceOneField, Resource,
     SaveButton, SelectColumnsButton, SelectField, SelectInput, Show, ShowButton,
     SimpleForm, SimpleShowLayout,
@@ -41,9 +42,9 @@ window.ReactAdmin = {
     downloadCSV, email, maxLength, maxValue, minLength, minValue, regex, required,
     useCreate, useCreatePath, useDelete, useDataProvider, useDeleteMany,
     useGetList, useGetMany, useGetOne, useGetRecordId,
-    useInfiniteGetList, useInput, useNotify,
-    useRecordContext, useRedirect, useRefresh, useResourceContext, useUnselect,
-    useUnselectAll, useUpdate, useUpdateMany,
+    useInfiniteGetList, useInput, useListContext, useListPaginationContext, useNotify,
+    useRecordContext, useRedirect, useRefresh, useResourceContext, useStore, useTranslate,
+    useUnselect, useUnselectAll, useUpdate, useUpdateMany,
 };
 
 let STATE;
@@ -107,22 +108,42 @@ const FUNCTIONS = {exportRecords, email, maxLength, maxValue, minLength, minValu
 
 /** Make an authenticated API request and return the response object. */
 function apiRequest(url, options) {
-    const headers = new Headers({
-        Accept: "application/json",
-        Authorization: localStorage.getItem("identity")
-    });
-    return fetch(url, Object.assign({"headers": headers}, options)).then((resp) => {
+    const headers = new Headers(options["headers"]);
+    if (!headers.has("Accept"))
+        headers.set("Accept", "application/json");
+    headers.set("Authorization", localStorage.getItem("identity"));
+    return fetch(url, Object.assign({}, options, {"headers": headers})).then((resp) => {
         if (resp.status < 200 || resp.status >= 300) {
             return resp.text().then(text => {
                 throw new HttpError(text, resp.status, text);
             });
         }
+        // The server re-issues permission claims once they have expired.
+        const claims = resp.headers.get("X-Claims");
+        const identity = claims && JSON.parse(localStorage.getItem("identity"));
+        if (identity) {
+            identity["claims"] = claims;
+            localStorage.setItem("identity", JSON.stringify(identity));
+        }
         return resp;
     });
 }
 
-/** Make a dataProvider request to the given resource's endpoint and return the JSON result. */
-function dataRequest(resource, endpoint, params) {
+// MessagePack is used if the server supports it (requires the msgpack package), except
+// for large list pages, which the server streams as JSON.
+const DATA_HEADERS = {"Accept": "application/msgpack, application/json;q=0.9"};
+
+/** Decode a data API response, which may be either MessagePack or JSON. */
+function decodeResponse(resp) {
+    if (resp.headers.get("Content-Type")?.startsWith("application/msgpack"))
+        return resp.arrayBuffer().then(decode);
+    return resp.json();
+}
+
+/** Make a dataProvider request to the given resource's endpoint and return the JSON result.
+
+    The request can be cancelled with an AbortSignal. */
+function dataRequest(resource, endpoint, params, signal) {
     for (const [k, v] of Object.entries(params)) {
         if (v === undefined)
             delete params[k];
@@ -132,20 +153,101 @@ function dataRequest(resource, endpoint, params) {
     const query = new URLSearchParams(params).toString();
 
     const [method, url] = STATE["resources"][resource]["urls"][endpoint];
-    return apiRequest(`${url}?${query}`, {"method": method}).then((resp) => resp.json());
+    const options = {"method": method, "headers": DATA_HEADERS, "signal": signal};
+    return apiRequest(`${url}?${query}`, options).then(decodeResponse);
+}
+
+/** Convert a list response in the columnar format to react-admin records.
+
+    Rows are arrays of values in the order of fields (or objects, if a row has
+    different fields). The IDs and fk_ values are derived from the key fields.
+    Resources which don't count records return pageInfo instead of total.
+    Resources with keys that can't be formatted in JS return the usual records. */
+function fromColumns(json) {
+    if (!("rows" in json))
+        return json;
+    const {fields, primaryKey, foreignKeys, rows, ...rest} = json;
+    const keyValue = (data, keys) => keys.map((k) => String(data[k])).join("|");
+    const records = rows.map((row) => {
+        const data = Array.isArray(row) ? Object.fromEntries(fields.map((f, i) => [f, row[i]])) : row;
+        const record = {"id": keyValue(data, primaryKey), "data": data};
+        for (const keys of foreignKeys) {
+            if (keys.every((k) => k in data)) {
+                const value = keys.some((k) => data[k] === null) ? null : keyValue(data, keys);
+                record["fk_" + [...keys].sort().join("__")] = value;
+            }
+        }
+        return record;
+    });
+    // Pass through total (with the approximate flag) or pageInfo, and cursor.
+    return {"data": records, ...rest};
+}
+
+/** Make a dataProvider list request, using the compact columnar response format. */
+function listRequest(resource, endpoint, params) {
+    return dataRequest(resource, endpoint, {...params, "format": "columns"}).then(fromColumns);
+}
+
+// Cursors for the page after recently fetched pages, keyed by the list query.
+const CURSORS = new Map();
+const MAX_CURSORS = 100;
+
+/** Fetch a page of a list, using keyset pagination when continuing from the previous page.
+
+    The server returns a cursor for the following page (if the resource supports it),
+    which avoids the database skipping over all the preceding rows. */
+function getList(resource, params) {
+    const {page, perPage} = params["pagination"];
+    const key = (p) => JSON.stringify([resource, p, perPage, params["sort"], params["filter"], params["meta"]]);
+    const cursor = CURSORS.get(key(page));
+    const query = cursor === undefined ? {...params} : {...params, cursor};
+    // The displayed columns are passed by ProjectedList, so hidden fields aren't fetched.
+    if (params["meta"]?.["fields"] !== undefined) {
+        const {fields, ...meta} = params["meta"];
+        query["fields"] = fields;
+        query["meta"] = Object.keys(meta).length ? meta : undefined;
+    }
+    // The total is fetched separately by DeferredPagination, so the rows display sooner.
+    if (STATE["resources"][resource]["deferred_count"])
+        query["count"] = false;
+    return listRequest(resource, "get_list", query).then(({"cursor": next, ...result}) => {
+        if (next !== undefined) {
+            CURSORS.set(key(page + 1), next);
+            if (CURSORS.size > MAX_CURSORS)
+                CURSORS.delete(CURSORS.keys().next().value);
+        }
+        return result;
+    });
+}
+
+/** Make a dataProvider request with the params sent as a JSON body.
+
+    Used for requests which include record data, avoiding URL length limits.
+    The server still accepts these params in the query string. */
+function dataBodyRequest(resource, endpoint, params) {
+    const [method, url] = STATE["resources"][resource]["urls"][endpoint];
+    const options = {
+        "method": method,
+        "body": JSON.stringify(params),
+        "headers": {...DATA_HEADERS, "Content-Type": "application/json"}
+    };
+    return apiRequest(url, options).then(decodeResponse);
 }
 
 
 const dataProvider = {
-    create: (resource, params) => dataRequest(resource, "create", params),
+    create: (resource, params) => dataBodyRequest(resource, "create", params),
     delete: (resource, params) => dataRequest(resource, "delete", params),
     deleteMany: (resource, params) => dataRequest(resource, "delete_many", params),
-    getList: (resource, params) => dataRequest(resource, "get_list", params),
+    getCount: (resource, params) => dataRequest(
+        resource, "get_count", {"filter": params["filter"], "meta": params["meta"]}, params["signal"]),
+    getList,
     getMany: (resource, params) => dataRequest(resource, "get_many", params),
-    getManyReference: (resource, params) => dataRequest(resource, "get_many_ref", params),
+    getManyReference: (resource, params) => listRequest(resource, "get_many_ref", params).then(
+        ({cursor, ...result}) => result),
     getOne: (resource, params) => dataRequest(resource, "get_one", params),
-    update: (resource, params) => dataRequest(resource, "update", params),
-    updateMany: (resource, params) => dataRequest(resource, "update_many", params)
+    update: (resource, params) => dataBodyRequest(resource, "update", params),
+    updateMany: (resource, params) => dataBodyRequest(resource, "update_many", params)
 }
 
 const authProvider = {
@@ -283,6 +385,60 @@ function createBulkUpdates(resource, name, permissions, refresh) {
     return buttons;
 }
 
+/** List pagination which fills in the total once it has been fetched with getCount().
+
+    The request is cancelled if the filter changes or the list is unmounted.
+    Approximate totals (from cached or estimated counts) are displayed as "~N". */
+const DeferredPagination = (props) => {
+    const {filterValues, resource} = useListContext();
+    const pagination = useListPaginationContext();
+    const dataProvider = useDataProvider();
+    const translate = useTranslate();
+    const [result, setResult] = useState();
+    const filterKey = JSON.stringify(filterValues);
+
+    useEffect(() => {
+        setResult(undefined);
+        const controller = new AbortController();
+        dataProvider.getCount(resource, {"filter": filterValues, "signal": controller.signal})
+            .then(setResult, () => {});
+        return () => controller.abort();
+    }, [dataProvider, resource, filterKey]);
+
+    if (result === undefined)
+        return <Pagination {...props} />;
+    const labelDisplayedRows = ({from, to, count}) => translate(
+        "ra.navigation.page_range_info", {"offsetBegin": from, "offsetEnd": to, "total": `~${count}`});
+    const approximate = result["approximate"] ? {labelDisplayedRows} : {};
+    return (
+        <ListPaginationContext.Provider value={{...pagination, "total": result["total"]}}>
+            <Pagination {...approximate} {...props} />
+        </ListPaginationContext.Provider>
+    );
+};
+
+/** Return the sources of the list columns currently displayed by DatagridConfigurable.
+
+    The column indexes selected by the user match the fields from createFields(). */
+function useListFields(resource, name, permissions) {
+    const [columns] = useStore(`preferences.${name}.datagrid.columns`);
+    const sources = Object.values(resource["fields"]).map((state) => state["props"]["source"])
+        .filter((source) => hasPermission(`${name}.${source.replace(/^data\./, "")}.view`, permissions));
+    if (columns === undefined)
+        return sources.filter((source) => !resource["list_omit"].includes(source));
+    return columns.map((i) => sources[Number(i)]).filter((source) => source !== undefined);
+}
+
+/** List which only fetches the fields of the displayed columns.
+
+    Hidden fields are fetched by getOne() in the show/edit views, or when the user
+    selects the column (which changes the list query). */
+const ProjectedList = ({resourceState, permissions, ...props}) => {
+    const name = useResourceContext();
+    const fields = useListFields(resourceState, name, permissions);
+    return <List queryOptions={{"meta": {"fields": fields}}} {...props} />;
+};
+
 const AiohttpList = (resource, name, permissions) => {
     const exporter = (records) => {
         jsonExport(exportRecords(records), (err, csv) => downloadCSV(csv, name));
@@ -310,12 +466,12 @@ const AiohttpList = (resource, name, permissions) => {
     const filterSources = filters.map(c => c["props"]["source"]);
 
     return (
-        <List actions={<ListActions />} exporter={exporter} filters={filters.filter((v, i) => filterSources.indexOf(v["props"]["source"]) === i)}>
+        <ProjectedList resourceState={resource} permissions={permissions} actions={<ListActions />} exporter={exporter} pagination={resource["deferred_count"] ? <DeferredPagination /> : undefined} filters={filters.filter((v, i) => filterSources.indexOf(v["props"]["source"]) === i)}>
             <DatagridConfigurable omit={resource["list_omit"]} rowClick="show" bulkActionButtons={<BulkActionButtons />}>
                 {createFields(resource["fields"], name, permissions)}
                 <WithRecord label="[Edit]" render={(record) => hasPermission(`${name}.edit`, permissions, record) && <EditButton />} />
             </DatagridConfigurable>
-        </List>
+        </ProjectedList>
     );
 }
 
@@ -0,0 +1,90 @@
+/** Minimal MessagePack decoder for API responses (https://msgpack.org/).
+
+    Only the types produced by the server are supported (no extension types).
+    Values are decoded the same as the JSON API: large integers are converted to Numbers
+    and binary values to strings. */
+
+const textDecoder = new TextDecoder();
+
+class Decoder {
+    constructor(buffer) {
+        this.view = new DataView(buffer);
+        this.bytes = new Uint8Array(buffer);
+        this.pos = 0;
+    }
+
+    /** Read a value of the given DataView type and size, advancing the position. */
+    read(type, size) {
+        const value = this.view[`get${type}`](this.pos);
+        this.pos += size;
+        return value;
+    }
+
+    str(length) {
+        const value = textDecoder.decode(this.bytes.subarray(this.pos, this.pos + length));
+        this.pos += length;
+        return value;
+    }
+
+    array(length) {
+        const value = new Array(length);
+        for (let i = 0; i < length; i++)
+            value[i] = this.decode();
+        return value;
+    }
+
+    map(length) {
+        const value = {};
+        for (let i = 0; i < length; i++) {
+            const k = this.decode();
+            value[k] = this.decode();
+        }
+        return value;
+    }
+
+    decode() {
+        const b = this.read("Uint8", 1);
+        if (b <= 0x7f)
+            return b;
+        if (b <= 0x8f)
+            return this.map(b & 0x0f);
+        if (b <= 0x9f)
+            return this.array(b & 0x0f);
+        if (b <= 0xbf)
+            return this.str(b & 0x1f);
+        if (b >= 0xe0)
+            return b - 0x100;
+
+        switch (b) {
+            case 0xc0: return null;
+            case 0xc2: return false;
+            case 0xc3: return true;
+            case 0xc4: return this.str(this.read("Uint8", 1));
+            case 0xc5: return this.str(this.read("Uint16", 2));
+            case 0xc6: return this.str(this.read("Uint32", 4));
+            case 0xca: return this.read("Float32", 4);
+            case 0xcb: return this.read("Float64", 8);
+            case 0xcc: return this.read("Uint8", 1);
+            case 0xcd: return this.read("Uint16", 2);
+            case 0xce: return this.read("Uint32", 4);
+            case 0xcf: return Number(this.read("BigUint64", 8));
+            case 0xd0: return this.read("Int8", 1);
+            case 0xd1: return this.read("Int16", 2);
+            case 0xd2: return this.read("Int32", 4);
+            case 0xd3: return Number(this.read("BigInt64", 8));
+            case 0xd9: return this.str(this.read("Uint8", 1));
+            case 0xda: return this.str(this.read("Uint16", 2));
+            case 0xdb: return this.str(this.read("Uint32", 4));
+            case 0xdc: return this.array(this.read("Uint16", 2));
+            case 0xdd: return this.array(this.read("Uint32", 4));
+            case 0xde: return this.map(this.read("Uint16", 2));
+            case 0xdf: return this.map(this.read("Uint32", 4));
+        }
+        throw new Error(`Unsupported MessagePack type: 0x${b.toString(16)}`);
+    }
+}
+
+/** Decode a MessagePack encoded ArrayBuffer. */
+export function decode(buffer) {
+    return new Decoder(buffer).decode();
+}
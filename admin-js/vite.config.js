@@ -1,15 +1,50 @@
+import { readdirSync, readFileSync, unlinkSync, writeFileSync } from "node:fs";
+import { join } from "node:path";
+import { brotliCompressSync, constants, gzipSync } from "node:zlib";
 import { defineConfig } from "vite";
 
+const HASHED_FILE = /^admin-[\w-]+\.js(\.map)?(\.gz|\.br)?$/;
+
+/** Write .gz/.br siblings of the bundle (served by aiohttp when accepted)
+    and remove bundles left over from previous builds. */
+const precompress = () => ({
+    name: "precompress",
+    apply: "build",
+    writeBundle(options, bundle) {
+        const current = new Set(Object.keys(bundle));
+        for (const name of readdirSync(options.dir)) {
+            const original = name.replace(/\.(gz|br)$/, "");
+            if (HASHED_FILE.test(name) && !current.has(original)) {
+                unlinkSync(join(options.dir, name));
+            }
+        }
+        for (const name of current) {
+            if (!name.endsWith(".js")) {
+                continue;
+            }
+            const path = join(options.dir, name);
+            const content = readFileSync(path);
+            writeFileSync(path + ".gz", gzipSync(content, {level: 9}));
+            writeFileSync(path + ".br", brotliCompressSync(content, {
+                params: {[constants.BROTLI_PARAM_QUALITY]: constants.BROTLI_MAX_QUALITY}}));
+        }
+    }
+});
+
 export default defineConfig({
     build: {
+        emptyOutDir: false,
+        manifest: true,
         minify: "terser",
         outDir: "../aiohttp_admin/static/",
         rollupOptions: {
             input: "src/admin.jsx",
             output: {
-                entryFileNames: "[name].js"
+                // The content hash allows browsers to cache the bundle indefinitely.
+                entryFileNames: "[name]-[hash].js"
             }
         },
         sourcemap: true,
     },
+    plugins: [precompress()],
 })
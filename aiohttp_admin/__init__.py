@@ -1,20 +1,34 @@
-import re
+import asyncio
+import base64
+import gzip
 import secrets
+from functools import partial
 from typing import Optional
 
 import aiohttp_security
 import aiohttp_session
-from aiohttp import web
-from aiohttp.typedefs import Handler
+from aiohttp import hdrs, web
+from aiohttp.typedefs import Handler, Middleware
+from aiohttp_session import AbstractStorage
 from aiohttp_session.cookie_storage import EncryptedCookieStorage
-from pydantic import ValidationError
+from cryptography.fernet import Fernet
+from pydantic import Json, ValidationError
 
+from .backends.abc import GetManyRefAPIParams
+from .codecs import AbstractJSONCodec, StdlibJSONCodec
 from .routes import setup_resources, setup_routes
-from .security import AdminAuthorizationPolicy, Permissions, TokenIdentityPolicy, check
-from .types import (Schema, State, UserDetails,
-                    check_credentials_key, data, fk, permission_re_key, state_key)
-
-__all__ = ("Permissions", "Schema", "UserDetails", "data", "fk", "permission_re_key", "setup")
+from .security import (AdminAuthorizationPolicy, FernetToken, IdentityCache, LoginThrottle,
+                       PasswordVerifier, PermissionParser, Permissions, SignedToken,
+                       TokenIdentityPolicy, TokenSerializer, _get_schema, check,
+                       hash_password, verify_password)
+from .types import (IdentityDict, Schema, State, UserDetails, _CompressionSchema,
+                    check_credentials_key, data, fk, identity_cache_key, index_key,
+                    json_codec_key, login_throttle_key, permission_re_key, state_key)
+from .views import IndexPage, _Login, _accepted_encodings
+
+__all__ = ("PasswordVerifier", "Permissions", "Schema", "UserDetails", "data", "fk",
+           "hash_password", "identity_cache_key", "permission_re_key", "setup",
+           "verify_password")
 __version__ = "0.1.0a3"
 
 
@@ -26,8 +40,48 @@ async def pydantic_middleware(request: web.Request, handler: Handler) -> web.Str
         raise web.HTTPBadRequest(text=e.json(), content_type="application/json")
 
 
+async def send_claims(request: web.Request, response: web.StreamResponse) -> None:
+    """Send re-issued permission claims to the client, to replace the expired ones."""
+    claims = request.get("aiohttpadmin_claims")
+    if claims is not None:
+        response.headers["X-Claims"] = claims
+
+
+def compression_middleware(min_size: int, level: int, executor_size: int) -> Middleware:
+    """Gzip response bodies of at least min_size bytes."""
+    @web.middleware
+    async def middleware(request: web.Request, handler: Handler) -> web.StreamResponse:
+        # Allow handlers streaming a response to enable compression on it.
+        request["aiohttpadmin_compression"] = True
+        response = await handler(request)
+        if (not isinstance(response, web.Response) or not isinstance(response.body, bytes)
+                or len(response.body) < min_size or response.prepared
+                or hdrs.CONTENT_ENCODING in response.headers):
+            return response
+
+        vary = ",".join(response.headers.getall(hdrs.VARY, ()))
+        if hdrs.ACCEPT_ENCODING.lower() not in (v.strip().lower() for v in vary.split(",")):
+            response.headers.add(hdrs.VARY, hdrs.ACCEPT_ENCODING)
+        if "gzip" not in _accepted_encodings(request.headers.get(hdrs.ACCEPT_ENCODING, "")):
+            return response
+
+        body = response.body
+        if len(body) > executor_size:
+            loop = asyncio.get_running_loop()
+            response.body = await loop.run_in_executor(
+                None, partial(gzip.compress, body, level, mtime=0))
+        else:
+            response.body = gzip.compress(body, level, mtime=0)
+        response.headers[hdrs.CONTENT_ENCODING] = "gzip"
+        return response
+
+    return middleware
+
+
 def setup(app: web.Application, schema: Schema, *, path: str = "/admin",
-          secret: Optional[bytes] = None) -> web.Application:
+          secret: Optional[bytes] = None,
+          session_storage: Optional[AbstractStorage] = None,
+          json_codec: Optional[AbstractJSONCodec] = None) -> web.Application:
     """Initialize the admin.
 
     Args:
@@ -39,6 +93,12 @@ def setup(app: web.Application, schema: Schema, *, path: str = "/admin",
             will result in users being logged out each time the app is restarted. To
             avoid this (or if using multiple servers) it is recommended to generate a
             random secret (e.g. secrets.token_bytes()) and save the value.
+        session_storage - aiohttp-session storage for the auth cookie. Defaults to an
+            EncryptedCookieStorage. A server-side storage (see aiohttp_admin.session)
+            avoids decrypting the cookie on each request. The cookie path is always set
+            to the admin path, other cookie options are taken from the storage.
+        json_codec - Codec used to encode responses and decode requests. Defaults to the
+            stdlib json module, aiohttp_admin.codecs.orjson.OrjsonCodec is faster.
 
     Returns the admin application.
     """
@@ -69,42 +129,66 @@ def setup(app: web.Application, schema: Schema, *, path: str = "/admin",
             urls = admin[state_key]["resources"][m.name]["urls"]
             urls.update((key(r), value(r)) for r in m.routes)
 
+        admin[index_key].render(admin)
+
     schema = check(Schema, schema)
     if secret is None:
         secret = secrets.token_bytes()
 
     admin = web.Application()
+    default: _CompressionSchema = {}
+    compression = schema.get("compression", default)
+    if compression is not None:
+        admin.middlewares.append(compression_middleware(
+            compression.get("min_size", 1024), compression.get("level", 5),
+            compression.get("executor_size", 65536)))
     admin.middlewares.append(pydantic_middleware)
     admin.on_startup.append(on_startup)
     admin[check_credentials_key] = schema["security"]["check_credentials"]
+    admin[json_codec_key] = json_codec or StdlibJSONCodec()
+    admin[index_key] = IndexPage()
     admin[state_key] = State({"view": schema.get("view", {}), "js_module": schema.get("js_module"),
                               "urls": {}, "resources": {}})
 
-    max_age = schema["security"].get("max_age")
-    secure = schema["security"].get("secure", True)
-    storage = EncryptedCookieStorage(
+    security = schema["security"]
+    identity_cache = IdentityCache(security.get("identity_callback"),
+                                   ttl=security.get("identity_ttl", 0),
+                                   maxsize=security.get("identity_cache_size", 1024))
+    admin[identity_cache_key] = identity_cache
+    admin[login_throttle_key] = LoginThrottle(
+        per_username=security.get("max_login_attempts", 0),
+        per_ip=security.get("max_login_attempts_per_ip", 0),
+        window=security.get("login_attempts_window", 300))
+
+    max_age = security.get("max_age")
+    secure = security.get("secure", True)
+    storage = session_storage or EncryptedCookieStorage(
         secret, max_age=max_age, httponly=True, samesite="Strict", secure=secure)
-    identity_policy = TokenIdentityPolicy(storage._fernet, schema)
+    token: TokenSerializer
+    if security.get("token_format", "fernet") == "signed":
+        token = SignedToken((secret, *security.get("previous_secrets", ())))
+    else:
+        token = FernetToken(Fernet(base64.urlsafe_b64encode(secret)))
+    claims = None
+    if security.get("permission_claims_ttl"):
+        claims = SignedToken((secret, *security.get("previous_secrets", ())), purpose=b"claims")
+    if claims is not None:
+        admin.on_response_prepare.append(send_claims)
+    identity_policy = TokenIdentityPolicy(token, schema, identity_cache, storage.cookie_name,
+                                          claims)
     aiohttp_session.setup(admin, storage)
-    aiohttp_security.setup(admin, identity_policy, AdminAuthorizationPolicy(schema))
+    aiohttp_security.setup(admin, identity_policy, AdminAuthorizationPolicy(identity_cache))
 
     setup_routes(admin)
     setup_resources(admin, schema)
 
-    resource_patterns = []
-    for r, state in admin[state_key]["resources"].items():
-        fields = (f.removeprefix("data.") for f in state["fields"].keys())
-        resource_patterns.append(
-            r"(?#Resource name){r}"
-            r"(?#Optional field name)(\.({f}))?"
-            r"(?#Permission type)\.(view|edit|add|delete|\*)"
-            r"(?#No filters if negated)(?(2)$|"
-            r'(?#Optional filters)\|({f})=(?#JSON number or str)(\".*?\"|\d+))*'.format(
-                r=r, f="|".join(fields)))
-    p_re = (r"(?#Global admin permission)~?admin\.(view|edit|add|delete|\*)"
-            r"|"
-            r"(?#Resource permission)(~)?admin\.({})").format("|".join(resource_patterns))
-    admin[permission_re_key] = re.compile(p_re)
+    admin[permission_re_key] = PermissionParser({
+        r: tuple(f.removeprefix("data.") for f in state["fields"])
+        for r, state in admin[state_key]["resources"].items()})
+    # Build the shared validators now, rather than on the first request. Resources build
+    # their own validators when they are created.
+    for t in (Json[IdentityDict], GetManyRefAPIParams, dict[str, object], _Login):
+        _get_schema(t)
 
     prefixed_subapp = app.add_subapp(path, admin)
     return admin
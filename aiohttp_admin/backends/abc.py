@@ -1,26 +1,42 @@
 import asyncio
+import base64
+import hashlib
 import json
 import sys
 from abc import ABC, abstractmethod
-from collections.abc import Sequence
+from collections.abc import AsyncGenerator, Awaitable, Sequence
+from contextlib import suppress
 from datetime import date, datetime, time
-from enum import Enum
-from functools import cached_property, partial
+from functools import cached_property
 from types import MappingProxyType
-from typing import Any, Generic, Literal, Optional, TypeVar, final
+from typing import Annotated, Any, Generic, Literal, NamedTuple, Optional, TypeVar, final
 
-from aiohttp import web
+from aiohttp import hdrs, web
+from aiohttp.helpers import ETAG_ANY
 from aiohttp_security import check_permission, permits
-from pydantic import Json
+from pydantic import BeforeValidator, ConfigDict, Json, TypeAdapter, with_config
 
-from ..security import check, permissions_as_dict
-from ..types import ComponentState, InputState, fk, resources_key
+from ..codecs import Encoder
+from ..security import CompiledPermissions, admin_policy, check
+from ..types import ComponentState, InputState, fk, json_codec_key, resources_key
+from ..views import _accepted_encodings
+
+try:
+    from ..codecs.msgpack import CONTENT_TYPE as MSGPACK, MsgpackCodec
+    _msgpack: Optional[MsgpackCodec] = MsgpackCodec()
+except ImportError:  # pragma: no cover
+    _msgpack = None
 
 if sys.version_info >= (3, 10):
     from typing import TypeAlias
 else:
     from typing_extensions import TypeAlias
 
+if sys.version_info >= (3, 11):
+    from typing import NotRequired
+else:
+    from typing_extensions import NotRequired
+
 if sys.version_info >= (3, 12):
     from typing import TypedDict
 else:
@@ -37,21 +53,104 @@ INPUT_TYPES = MappingProxyType({
     "NumberInput": float,
     "TimeInput": time
 })
+# Key types which the client formats the same as str() (see _columns_header()).
+_PLAIN_KEY_TYPES = (str, int, Optional[str], Optional[int])
+
+
+def response_type(request: web.Request) -> str:
+    """Return the content type to respond with, JSON unless MessagePack is accepted."""
+    if _msgpack is not None:
+        if MSGPACK in _accepted_encodings(request.headers.get(hdrs.ACCEPT, "")):
+            return MSGPACK
+    return "application/json"
+
+
+def accepts_json(request: web.Request) -> bool:
+    """Return True if a JSON response is acceptable to the client."""
+    accepted = _accepted_encodings(request.headers.get(hdrs.ACCEPT, "*/*"))
+    return not accepted.isdisjoint(("application/json", "application/*", "*/*"))
+
+
+async def _close_chunks(chunks: AsyncGenerator[Sequence[Record], None],
+                        pending: Optional[Awaitable[Sequence[Record]]]) -> None:
+    """Close a stream_list() generator, after any chunk still being fetched."""
+    if pending is not None:
+        with suppress(Exception):
+            await pending
+    await chunks.aclose()
+
+
+def _encode(request: web.Request, data: object) -> tuple[bytes, str]:
+    content_type = response_type(request)
+    if _msgpack is not None and content_type == MSGPACK:
+        return _msgpack.dumps(data), content_type
+    return request.app[json_codec_key].dumps(data), content_type
+
+
+def json_response(request: web.Request, data: object) -> web.Response:
+    """Return a JSON response, encoded with the admin's codec.
+
+    If the client accepts application/msgpack, the response is encoded with MessagePack.
+    """
+    body, content_type = _encode(request, data)
+    return web.Response(body=body, content_type=content_type,
+                        headers={hdrs.VARY: hdrs.ACCEPT})
+
+
+async def read_json(request: web.Request, max_size: int) -> object:
+    """Read and decode a JSON request body, rejecting bodies over max_size bytes."""
+    if request.content_length is not None and request.content_length > max_size:
+        raise web.HTTPRequestEntityTooLarge(max_size, request.content_length)
+
+    body = bytearray()
+    async for chunk in request.content.iter_any():
+        body += chunk
+        if len(body) > max_size:
+            raise web.HTTPRequestEntityTooLarge(max_size, len(body))
+
+    try:
+        return request.app[json_codec_key].loads(bytes(body))
+    except ValueError:
+        raise web.HTTPBadRequest(text="Invalid JSON")
+
+
+def not_modified(request: web.Request, etag: str) -> bool:
+    """Return True if the client already has the response identified by etag."""
+    return any(e.value in (etag, ETAG_ANY) for e in request.if_none_match or ())
+
+
+def not_modified_response(etag: str) -> web.Response:
+    return web.Response(status=304, headers={"ETag": f'W/"{etag}"', hdrs.VARY: hdrs.ACCEPT})
+
+
+def cached_json_response(request: web.Request, data: object,
+                         etag: Optional[str] = None) -> web.Response:
+    """Return a JSON response with an ETag, or 304 if the client's copy is current.
+
+    If etag is not provided, it is generated from a hash of the response body.
+    """
+    body, content_type = _encode(request, data)
+    if etag is None:
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    return web.Response(body=body, content_type=content_type,
+                        headers={"ETag": f'W/"{etag}"', hdrs.VARY: hdrs.ACCEPT})
 
 
-class Encoder(json.JSONEncoder):
-    def default(self, o: object) -> Any:
-        if isinstance(o, (date, time)):
-            return str(o)
-        if isinstance(o, Enum):
-            return o.value
-        if isinstance(o, bytes):
-            return o.decode(errors="replace")
+class ApproximateTotal(int):
+    """Total count which is an estimate (or may be out of date), rather than exact.
 
-        return super().default(o)
+    The response tells the client the total is approximate.
+    """
 
 
-json_response = partial(web.json_response, dumps=partial(json.dumps, cls=Encoder))
+class PartialTotal(int):
+    """Lower bound of the total count, used to tell if there is a next page.
+
+    This is the number of records up to the end of the requested page, plus at least
+    1 if there are more records after it. The client is sent pageInfo instead of a total.
+    """
 
 
 class APIRecord(TypedDict):
@@ -73,12 +172,36 @@ class _Params(TypedDict, total=False):
     meta: Meta
 
 
-class GetListParams(_Params):
+class Cursor(NamedTuple):
+    """Position of the last record of a page, used to fetch the page after it."""
+    # Value of the sort field.
+    value: object
+    # Primary key of the record, to order records with equal sort values.
+    key: tuple[object, ...]
+
+
+class _ListParams(_Params, total=False):
+    # If given, the page starts after this position (keyset pagination), rather than
+    # using pagination["page"]. Only sent to resources with keyset_pagination enabled.
+    cursor: Cursor
+    # If False, the client fetches the total separately from the count endpoint, so
+    # get_list() only needs to return a PartialTotal (to tell if there is a next page).
+    count: bool
+    # If given, only these fields need to be fetched for each record (the columns
+    # displayed, plus any fields needed for IDs, references, sorting and permissions).
+    fields: tuple[str, ...]
+
+
+class GetListParams(_ListParams):
     pagination: Json[_Pagination]
     sort: Json[_Sort]
     filter: Json[dict[str, object]]
 
 
+class GetCountParams(_Params):
+    filter: Json[dict[str, object]]
+
+
 class GetOneParams(_Params):
     id: str
 
@@ -95,7 +218,7 @@ class GetManyRefAPIParams(_Params):
     filter: Json[dict[str, object]]
 
 
-class GetManyRefParams(_Params):
+class GetManyRefParams(_ListParams):
     target: tuple[str, ...]
     id: tuple[object, ...]
     pagination: Json[_Pagination]
@@ -137,7 +260,136 @@ class _ListQuery(TypedDict):
     filter: dict[str, object]
 
 
+def _total_fields(total: int) -> dict[str, object]:
+    """Return the response fields for a total count."""
+    if isinstance(total, ApproximateTotal):
+        return {"total": total, "approximate": True}
+    return {"total": total}
+
+
+def _split_id(value: object) -> object:
+    """Split a composite ID from its string form (e.g. "1|2")."""
+    return value.split("|") if isinstance(value, str) else value
+
+
+def _merge_filter(value: object) -> object:
+    """Flatten a react-admin filter into a filter on record fields."""
+    if not isinstance(value, dict):
+        return value
+    filters = {k: v for k, v in value.items() if k != "data"}
+    data = value.get("data", {})
+    if not isinstance(data, dict):
+        raise ValueError("data filter must be an object")
+    filters.update(data)
+
+    merged: dict[str, object] = {}
+    for k, v in filters.items():
+        if k.startswith("fk_"):
+            if not isinstance(v, str):
+                raise ValueError(f"{k} filter must be a string")
+            merged.update(zip(k.removeprefix("fk_").split("__"), v.split("|")))
+        else:
+            merged[k] = v
+    return merged
+
+
+def encode_cursor(field: str, value: object, key: tuple[object, ...]) -> str:
+    """Return an opaque cursor for the given position in a list sorted by field."""
+    data = json.dumps((field, value, key), cls=Encoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def _decode_cursor(value: object) -> object:
+    if not isinstance(value, str):
+        return value
+    try:
+        return json.loads(base64.urlsafe_b64decode(value))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+
+
+def _params(name: str, fields: dict[str, Any]) -> TypeAdapter[Any]:
+    """Return a validator for request parameters, with an optional meta."""
+    params = TypedDict(name, {**fields, "meta": NotRequired[Meta]})  # type: ignore[misc]
+    return TypeAdapter(params)
+
+
+class _RequestDecoders:
+    """Validators for the requests of one resource, built once at setup.
+
+    Each validates and converts a request's parameters in a single pass, including the
+    IDs and filters which depend on the resource's types.
+    """
+
+    def __init__(self, id_type: type[tuple[object, ...]], record_type: dict[str, TypeAlias]):
+        self._record_type = record_type
+        self._references: dict[tuple[str, ...], TypeAdapter[Any]] = {}
+
+        id_ = Annotated[id_type, BeforeValidator(_split_id)]  # type: ignore[valid-type]
+        ids = Json[tuple[id_, ...]]
+        filter_fields = TypedDict("Filter", record_type, total=False)  # type: ignore[misc]
+        # Unknown filter fields are an error, rather than being silently dropped.
+        filter_ = Annotated[with_config(ConfigDict(extra="forbid"))(filter_fields),  # type: ignore[valid-type]
+                            BeforeValidator(_merge_filter)]
+
+        self.id: TypeAdapter[Any] = TypeAdapter(id_)
+        self.record: TypeAdapter[Record] = TypeAdapter(
+            TypedDict("RecordType", record_type, total=False))  # type: ignore[operator]
+        self.filter: TypeAdapter[dict[str, object]] = TypeAdapter(filter_)
+        self.get_list = _params("GetListParams", {
+            "pagination": Json[_Pagination], "sort": Json[_Sort],
+            "filter": Json[filter_],  # type: ignore[misc,valid-type]
+            # Converted to a Cursor by _check_cursor(), once the sort field is known.
+            "cursor": NotRequired[Annotated[tuple[str, object, tuple[object, ...]],
+                                            BeforeValidator(_decode_cursor)]],
+            "count": NotRequired[bool],
+            # Sources of the displayed columns, converted by _list_fields().
+            "fields": NotRequired[Json[tuple[str, ...]]]})
+        self.get_count = _params("GetCountParams", {
+            "filter": Json[filter_]})  # type: ignore[misc,valid-type]
+        self.get_one = _params("GetOneParams", {"id": id_})
+        self.get_many = _params("GetManyParams", {"ids": ids})
+        self.create = _params("CreateParams", {"data": Json[_CreateData]})
+        self.update = _params("UpdateParams", {
+            "id": id_, "data": Json[APIRecord], "previousData": Json[APIRecord]})
+        self.update_many = _params("UpdateManyParams", {"ids": ids, "data": Json[Record]})
+        # The same parameters, when sent as a JSON request body.
+        self.create_body = _params("CreateBody", {"data": _CreateData})
+        self.update_body = _params("UpdateBody", {
+            "id": id_, "data": APIRecord, "previousData": APIRecord})
+        self.update_many_body = _params("UpdateManyBody", {
+            "ids": tuple[id_, ...], "data": Record})
+        self.delete = _params("DeleteParams", {"id": id_, "previousData": Json[APIRecord]})
+        self.delete_many = _params("DeleteManyParams", {"ids": ids})
+
+    def reference_id(self, target: tuple[str, ...]) -> TypeAdapter[Any]:
+        """Return a validator for a reference ID made up of the target fields."""
+        adapter = self._references.get(target)
+        if adapter is None:
+            id_type = tuple.__class_getitem__(tuple(self._record_type[k] for k in target))
+            adapter = TypeAdapter(Annotated[id_type, BeforeValidator(_split_id)])
+            self._references[target] = adapter
+        return adapter
+
+
 class AbstractAdminResource(ABC, Generic[_ID]):
+    # List requests for more records than this are streamed using stream_list().
+    stream_threshold = 500
+    # Maximum size in bytes of a JSON request body.
+    max_body_size = 1024**2
+    # Whether get_list() supports the cursor parameter. If enabled, list responses
+    # include a cursor to fetch the next page without an offset.
+    keyset_pagination = False
+    # Field which changes whenever a record is modified (e.g. a version counter or an
+    # updated_at timestamp). If set, ETags for read requests are generated from the
+    # record versions, allowing unchanged responses to skip serialisation.
+    version_field: Optional[str] = None
+    # Whether the admin client should fetch list totals separately with get_count(),
+    # so the rows are displayed without waiting for the count to complete.
+    deferred_count = False
+    # If set, browsers may cache get_count() responses for this many seconds.
+    count_max_age = 0
+
     name: str
     fields: dict[str, ComponentState]
     inputs: dict[str, InputState]
@@ -154,20 +406,51 @@ class AbstractAdminResource(ABC, Generic[_ID]):
         if record_type is None:
             record_type = {k.removeprefix("data."): Any for k in self.inputs}
         self._raw_record_type = record_type
-        self._record_type = TypedDict("RecordType", record_type, total=False)  # type: ignore[misc]
+        self._decoders = _RequestDecoders(self._id_type, record_type)
 
     @final
     async def filter_by_permissions(self, request: web.Request, perm_type: str,
                                     record: Record, original: Optional[Record] = None) -> Record:
-        """Return a filtered record containing permissible fields only."""
-        return {k: v for k, v in record.items()
-                if await permits(request, f"admin.{self.name}.{k}.{perm_type}",
-                                 context=(request, original or record))}
+        """Return a filtered record containing permissible fields only.
+
+        Must be called after a permission check has been done for the request.
+        """
+        permissions: CompiledPermissions = request["aiohttpadmin_permissions"]
+        return permissions.filter_fields(f"admin.{self.name}", perm_type, (record,),
+                                         (original or record,))[0]
 
     @abstractmethod
     async def get_list(self, params: GetListParams) -> tuple[list[Record], int]:
         """Return list of records and total count available (when not paginating)."""
 
+    async def stream_list(
+        self, params: GetListParams
+    ) -> tuple[AsyncGenerator[Sequence[Record], None], int]:
+        """Return chunks of the list of records and total count available.
+
+        Used for large pages, this allows records to be sent to the client without
+        holding the whole page in memory. The default implementation uses get_list().
+        """
+        records, total = await self.get_list(params)
+
+        async def chunks() -> AsyncGenerator[Sequence[Record], None]:
+            yield records
+
+        return chunks(), total
+
+    async def get_count(self, params: GetCountParams) -> int:
+        """Return the total count of records matching the filter.
+
+        The default implementation uses get_list().
+        """
+        list_params: GetListParams = {
+            "filter": params["filter"], "pagination": {"page": 1, "perPage": 1},
+            "sort": {"field": self.primary_key[0], "order": "ASC"}}
+        if "meta" in params:
+            list_params["meta"] = params["meta"]
+        _records, total = await self.get_list(list_params)
+        return total
+
     @abstractmethod
     async def get_one(self, record_id: _ID, meta: Meta) -> Record:
         """Return the matching record."""
@@ -221,40 +504,138 @@ class AbstractAdminResource(ABC, Generic[_ID]):
     # https://marmelab.com/react-admin/DataProviderWriting.html
 
     @final
-    async def _get_list(self, request: web.Request) -> web.Response:
+    async def _get_list(self, request: web.Request) -> web.StreamResponse:
         await check_permission(request, f"admin.{self.name}.view", context=(request, None))
-        query = check(GetListParams, request.query)
+        query: GetListParams = self._decoders.get_list.validate_python(request.query)
         self._process_list_query(query, request)
+        if "cursor" in query:
+            query["cursor"] = self._check_cursor(query["cursor"], query["sort"]["field"])
+        if "fields" in query:
+            query["fields"] = self._list_fields(query["fields"], query, request)
+
+        # MessagePack arrays are prefixed with their length, so can't be streamed. Large
+        # pages are streamed as JSON instead, if the client accepts it.
+        if (query["pagination"]["perPage"] > self.stream_threshold
+                and (response_type(request) == "application/json" or accepts_json(request))):
+            return await self._stream_list(request, query)
 
         raw_results, total = await self.get_list(query)
-        results = [await self._convert_record(r, request) for r in raw_results
-                   if await permits(request, f"admin.{self.name}.view", context=(request, r))]
-        return json_response({"data": results, "total": total})
+        etag = self._version_etag(request, raw_results, total)
+        if etag is not None and not_modified(request, etag):
+            return not_modified_response(etag)
+        cursor = self._next_cursor(request, query, raw_results[-1:], len(raw_results))
+        return cached_json_response(
+            request, self._list_data(raw_results, total, request, query["pagination"], cursor),
+            etag)
+
+    @final
+    async def _stream_list(self, request: web.Request,
+                           query: GetListParams) -> web.StreamResponse:
+        chunks, total = await self.stream_list(query)
+        dumps = request.app[json_codec_key].dumps
+
+        response = web.StreamResponse(headers={hdrs.VARY: hdrs.ACCEPT})
+        response.content_type = "application/json"
+        response.enable_chunked_encoding()
+        if request.get("aiohttpadmin_compression"):
+            response.enable_compression()
+        columns = self._columns_format(request)
+        fields: Optional[tuple[str, ...]] = None
+        count = 0
+        last: Sequence[Record] = ()
+        pending: Optional[asyncio.Future[Sequence[Record]]] = None
+        try:
+            await response.prepare(request)
+            if not columns:
+                await response.write(b'{"data":[')
+            sep = b""
+            while True:
+                # Shielded, so a cancelled request can't interrupt a database query,
+                # which would stop the connection being returned to the pool.
+                pending = asyncio.ensure_future(chunks.__anext__())
+                try:
+                    chunk = await asyncio.shield(pending)
+                except StopAsyncIteration:
+                    break
+                pending = None
+                if chunk:
+                    count += len(chunk)
+                    last = chunk[-1:]
+                results: Sequence[object]
+                if columns:
+                    records = self._view_records(chunk, request)
+                    if fields is None and records:
+                        # The columns are taken from the first record.
+                        fields = tuple(records[0])
+                        header = self._columns_header(fields)
+                        await response.write(dumps(header)[:-1] + b',"rows":[')
+                    results = self._rows(records, fields or ())
+                else:
+                    results = self._convert_records(chunk, request)
+                if results:
+                    # Strip the brackets to join the encoded chunks into one array.
+                    await response.write(sep + dumps(results)[1:-1])
+                    sep = b","
+            if columns and fields is None:
+                await response.write(dumps(self._columns_header(()))[:-1] + b',"rows":[')
+            totals = self._total_data(total, query["pagination"], count)
+            # Strip the braces to append the fields to the response object.
+            await response.write(b"]," + dumps(totals)[1:-1])
+            cursor = self._next_cursor(request, query, last, count)
+            if cursor is not None:
+                await response.write(b',"cursor":' + dumps(cursor))
+            await response.write(b"}")
+        except ConnectionResetError:
+            # The client disconnected.
+            return response
+        finally:
+            # Release any database cursor if the client disconnects.
+            await asyncio.shield(_close_chunks(chunks, pending))
+        await response.write_eof()
+        return response
+
+    @final
+    async def _get_count(self, request: web.Request) -> web.Response:
+        await check_permission(request, f"admin.{self.name}.view", context=(request, None))
+        query: GetCountParams = self._decoders.get_count.validate_python(request.query)
+        self._add_permission_filters(query["filter"], request)
+
+        total = await self.get_count(query)
+        response = cached_json_response(request, _total_fields(total))
+        if self.count_max_age:
+            response.headers[hdrs.CACHE_CONTROL] = f"private, max-age={self.count_max_age}"
+        return response
 
     @final
     async def _get_one(self, request: web.Request) -> web.Response:
         await check_permission(request, f"admin.{self.name}.view", context=(request, None))
-        query = check(GetOneParams, request.query)
-        record_id = check(self._id_type, query["id"].split("|"))
+        query = self._decoders.get_one.validate_python(request.query)
+        record_id: _ID = query["id"]
 
         result = await self.get_one(record_id, query.get("meta"))
         if not await permits(request, f"admin.{self.name}.view", context=(request, result)):
             raise web.HTTPForbidden()
-        return json_response({"data": await self._convert_record(result, request)})
+        etag = self._version_etag(request, (result,))
+        if etag is not None and not_modified(request, etag):
+            return not_modified_response(etag)
+        return cached_json_response(request, {"data": self._convert_record(result, request)},
+                                    etag)
 
     @final
     async def _get_many(self, request: web.Request) -> web.Response:
         await check_permission(request, f"admin.{self.name}.view", context=(request, None))
-        query = check(GetManyParams, request.query)
-        record_ids = check(tuple[self._id_type, ...], (q.split("|") for q in query["ids"]))  # type: ignore[name-defined]
+        query = self._decoders.get_many.validate_python(request.query)
+        record_ids: tuple[_ID, ...] = query["ids"]
 
         raw_results = await self.get_many(record_ids, query.get("meta"))
         if not raw_results:
             raise web.HTTPNotFound()
 
-        results = [await self._convert_record(r, request) for r in raw_results
-                   if await permits(request, f"admin.{self.name}.view", context=(request, r))]
-        return json_response({"data": results})
+        etag = self._version_etag(request, raw_results)
+        if etag is not None and not_modified(request, etag):
+            return not_modified_response(etag)
+        results = self._convert_records(raw_results, request)
+        return cached_json_response(request, {"data": results}, etag)
 
     @final
     async def _get_many_ref(self, request: web.Request) -> web.Response:
@@ -267,45 +648,45 @@ class AbstractAdminResource(ABC, Generic[_ID]):
 
         await check_permission(request, f"admin.{ref_model.name}.view", context=(request, None))
 
+        query["filter"] = ref_model._decoders.filter.validate_python(query["filter"])
         ref_model._process_list_query(query, request)
 
         if query["target"].startswith("fk_"):
             target = tuple(query["target"].removeprefix("fk_").split("__"))
-            record_id = tuple(check(self._raw_record_type[k], v)
-                              for k, v in zip(target, query["id"].split("|")))
+            record_id = self._decoders.reference_id(target).validate_python(query["id"])
         else:
             target = (query["target"],)
-            record_id = check(self._id_type, query["id"].split("|"))
+            record_id = self._decoders.id.validate_python(query["id"])
 
         raw_results, total = await self.get_many_ref({**query, "target": target, "id": record_id})
 
-        results = [await ref_model._convert_record(r, request) for r in raw_results
-                   if await permits(request, f"admin.{ref_model.name}.view", context=(request, r))]
-        return json_response({"data": results, "total": total})
+        etag = ref_model._version_etag(request, raw_results, total)
+        if etag is not None and not_modified(request, etag):
+            return not_modified_response(etag)
+        return cached_json_response(
+            request, ref_model._list_data(raw_results, total, request, query["pagination"]),
+            etag)
 
     @final
     async def _create(self, request: web.Request) -> web.Response:
-        query = check(CreateParams, request.query)
-        # TODO(Pydantic): Dissallow extra arguments
+        query = await self._decode(request, self._decoders.create, self._decoders.create_body)
         for k in query["data"]["data"]:
             if k not in self.inputs:
                 raise web.HTTPBadRequest(reason=f"Invalid field '{k}'")
         record = self._check_record(query["data"]["data"])
         await check_permission(request, f"admin.{self.name}.add", context=(request, record))
-        for k, v in record.items():
-            if v is not None:
-                await check_permission(request, f"admin.{self.name}.{k}.add",
-                                       context=(request, record))
+        fields = (f"admin.{self.name}.{k}.add" for k, v in record.items() if v is not None)
+        if not admin_policy(request).permits_all(request, fields, record):
+            raise web.HTTPForbidden()
 
         result = await self.create(record, query.get("meta"))
-        return json_response({"data": await self._convert_record(result, request)})
+        return json_response(request, {"data": self._convert_record(result, request)})
 
     @final
     async def _update(self, request: web.Request) -> web.Response:
         await check_permission(request, f"admin.{self.name}.edit", context=(request, None))
-        query = check(UpdateParams, request.query)
-        record_id = check(self._id_type, query["id"].split("|"))
-        # TODO(Pydantic): Dissallow extra arguments
+        query = await self._decode(request, self._decoders.update, self._decoders.update_body)
+        record_id: _ID = query["id"]
         for k in query["data"]["data"]:
             if k not in self.inputs:
                 raise web.HTTPBadRequest(reason=f"Invalid field '{k}'")
@@ -329,14 +710,14 @@ class AbstractAdminResource(ABC, Generic[_ID]):
             raise web.HTTPBadRequest(reason="No allowed fields to change.")
 
         result = await self.update(record_id, record, previous_data, query.get("meta"))
-        return json_response({"data": await self._convert_record(result, request)})
+        return json_response(request, {"data": self._convert_record(result, request)})
 
     @final
     async def _update_many(self, request: web.Request) -> web.Response:
         await check_permission(request, f"admin.{self.name}.edit", context=(request, None))
-        query = check(UpdateManyParams, request.query)
-        record_ids = check(tuple[self._id_type, ...], (i.split("|") for i in query["ids"]))  # type: ignore[name-defined]
-        # TODO(Pydantic): Dissallow extra arguments
+        query = await self._decode(request, self._decoders.update_many,
+                                   self._decoders.update_many_body)
+        record_ids: tuple[_ID, ...] = query["ids"]
         for k in query["data"]:
             if k not in self.inputs:
                 raise web.HTTPBadRequest(reason=f"Invalid field '{k}'")
@@ -346,25 +727,23 @@ class AbstractAdminResource(ABC, Generic[_ID]):
         originals = await self.get_many(record_ids, query.get("meta"))
         if not originals:
             raise web.HTTPNotFound()
-        allowed = (permits(request, f"admin.{self.name}.edit", context=(request, r))
-                   for r in originals)
-        allowed_f = (permits(request, f"admin.{self.name}.{k}.edit", context=(request, r))
-                     for r in originals for k in record)
-        if not all(await asyncio.gather(*allowed, *allowed_f)):
+        policy = admin_policy(request)
+        perms = (f"admin.{self.name}.edit", *(f"admin.{self.name}.{k}.edit" for k in record))
+        if not all(policy.permits_many(request, p, originals) for p in perms):
             raise web.HTTPForbidden()
         # Check new values are allowed by permission filters.
-        if not await permits(request, f"admin.{self.name}.edit", context=(request, record)):
+        if not policy.permits_many(request, f"admin.{self.name}.edit", (record,)):
             raise web.HTTPForbidden()
 
         ids = await self.update_many(record_ids, record, query.get("meta"))
         # get_many() is called above, so we can be sure there will be results here.
-        return json_response({"data": self._convert_ids(ids)})
+        return json_response(request, {"data": self._convert_ids(ids)})
 
     @final
     async def _delete(self, request: web.Request) -> web.Response:
         await check_permission(request, f"admin.{self.name}.delete", context=(request, None))
-        query = check(DeleteParams, request.query)
-        record_id = check(self._id_type, query["id"].split("|"))
+        query = self._decoders.delete.validate_python(request.query)
+        record_id: _ID = query["id"]
         previous_data = self._check_record(query["previousData"]["data"])
 
         original = await self.get_one(record_id, query.get("meta"))
@@ -372,35 +751,173 @@ class AbstractAdminResource(ABC, Generic[_ID]):
             raise web.HTTPForbidden()
 
         result = await self.delete(record_id, previous_data, query.get("meta"))
-        return json_response({"data": await self._convert_record(result, request)})
+        return json_response(request, {"data": self._convert_record(result, request)})
 
     @final
     async def _delete_many(self, request: web.Request) -> web.Response:
         await check_permission(request, f"admin.{self.name}.delete", context=(request, None))
-        query = check(DeleteManyParams, request.query)
-        record_ids = check(tuple[self._id_type, ...], (i.split("|") for i in query["ids"]))  # type: ignore[name-defined]
+        query = self._decoders.delete_many.validate_python(request.query)
+        record_ids: tuple[_ID, ...] = query["ids"]
 
         originals = await self.get_many(record_ids, query.get("meta"))
-        allowed = await asyncio.gather(*(permits(request, f"admin.{self.name}.delete",
-                                                 context=(request, r)) for r in originals))
-        if not all(allowed):
+        if not admin_policy(request).permits_many(request, f"admin.{self.name}.delete",
+                                                  originals):
             raise web.HTTPForbidden()
 
         ids = await self.delete_many(record_ids, query.get("meta"))
         if not ids:
             raise web.HTTPNotFound()
-        return json_response({"data": self._convert_ids(ids)})
+        return json_response(request, {"data": self._convert_ids(ids)})
+
+    @final
+    async def _decode(self, request: web.Request, query_decoder: TypeAdapter[Any],
+                      body_decoder: TypeAdapter[Any]) -> Any:
+        """Validate the parameters from the JSON body, or the query string if no body."""
+        if request.content_type == "application/json":
+            return body_decoder.validate_python(await read_json(request, self.max_body_size))
+        return query_decoder.validate_python(request.query)
 
     @final
     def _check_record(self, record: Record) -> Record:
         """Check and convert input record."""
-        return check(self._record_type, record)
+        return self._decoders.record.validate_python(record)
 
     @final
-    async def _convert_record(self, record: Record, request: web.Request) -> APIRecord:
+    def _convert_record(self, record: Record, request: web.Request) -> APIRecord:
         """Convert record to correct output format."""
-        record = await self.filter_by_permissions(request, "view", record)
+        permissions: CompiledPermissions = request["aiohttpadmin_permissions"]
+        record = permissions.filter_fields(f"admin.{self.name}", "view", (record,))[0]
+        return self._api_record(record)
+
+    @final
+    def _convert_records(self, records: Sequence[Record],
+                         request: web.Request) -> list[APIRecord]:
+        """Convert the records the user may view to correct output format."""
+        return [self._api_record(r) for r in self._view_records(records, request)]
+
+    @final
+    def _view_records(self, records: Sequence[Record], request: web.Request) -> list[Record]:
+        """Return the records the user may view, containing only the permitted fields.
+
+        Permissions are evaluated for the whole page of records in a single pass.
+        """
+        permissions: CompiledPermissions = request["aiohttpadmin_permissions"]
+        view = f"admin.{self.name}.view"
+        records = [r for r in records if permissions.permits(view, r)]
+        return permissions.filter_fields(f"admin.{self.name}", "view", records)
+
+    @final
+    def _list_data(self, records: Sequence[Record], total: int, request: web.Request,
+                   pagination: _Pagination, cursor: Optional[str] = None) -> dict[str, object]:
+        """Return the list response, in the columnar format if requested."""
+        data: dict[str, object]
+        totals = self._total_data(total, pagination, len(records))
+        if not self._columns_format(request):
+            data = {"data": self._convert_records(records, request)}
+        else:
+            records = self._view_records(records, request)
+            fields = tuple(records[0]) if records else ()
+            data = {**self._columns_header(fields), "rows": self._rows(records, fields)}
+        data.update(totals)
+        if cursor is not None:
+            data["cursor"] = cursor
+        return data
+
+    @staticmethod
+    def _total_data(total: int, pagination: _Pagination, count: int) -> dict[str, object]:
+        """Return the total fields of a list response.
+
+        count is the number of records returned for the page (before permission filters).
+        """
+        if isinstance(total, PartialTotal):
+            page = pagination["page"]
+            end = (page - 1) * pagination["perPage"] + count
+            return {"pageInfo": {"hasNextPage": total > end, "hasPreviousPage": page > 1}}
+        return _total_fields(total)
 
+    @final
+    def _check_cursor(self, cursor: Any, field: str) -> Cursor:
+        """Convert a decoded cursor to the types of the sort and primary key fields."""
+        if not self.keyset_pagination:
+            raise web.HTTPBadRequest(reason="Keyset pagination is not supported.")
+        cursor_field, value, key = cursor
+        if cursor_field != field or field not in self._raw_record_type:
+            raise web.HTTPBadRequest(reason="Cursor does not match the sort field.")
+        return Cursor(check(self._raw_record_type[field], value),
+                      self._decoders.id.validate_python(key))
+
+    @final
+    def _next_cursor(self, request: web.Request, query: GetListParams,
+                     last: Sequence[Record], count: int) -> Optional[str]:
+        """Return a cursor to the page after a full page of count records, ending in last.
+
+        No cursor is returned if the next page can't be fetched with keyset pagination
+        (e.g. the last sort value is not visible to the user).
+        """
+        if not self.keyset_pagination or not last or count < query["pagination"]["perPage"]:
+            return None
+        field = query["sort"]["field"]
+        keys = (field, *self.primary_key)
+        permissions: CompiledPermissions = request["aiohttpadmin_permissions"]
+        record = permissions.filter_fields(f"admin.{self.name}", "view", last)[0]
+        if not all(k in record for k in keys):
+            return None
+        return encode_cursor(field, record[field], tuple(record[pk] for pk in self.primary_key))
+
+    @final
+    def _list_fields(self, sources: Sequence[str], query: GetListParams,
+                     request: web.Request) -> tuple[str, ...]:
+        """Return the record fields needed to display the given list columns."""
+        fields = {*self.primary_key, query["sort"]["field"]}
+        fields.update(k for keys in self._foreign_rows for k in keys)
+        if self.version_field is not None:
+            fields.add(self.version_field)
+        # Records are checked against permission filters, which may use any field.
+        permissions: CompiledPermissions = request["aiohttpadmin_permissions"]
+        fields.update(attr for filters in permissions.as_dict.values() for attr in filters)
+
+        for source in sources:
+            if source.startswith("data."):
+                fields.add(source.removeprefix("data."))
+            elif source.startswith("fk_"):
+                fields.update(source.removeprefix("fk_").split("__"))
+        return tuple(sorted(fields))
+
+    @final
+    def _columns_format(self, request: web.Request) -> bool:
+        """Return True if the list response should use the columnar format.
+
+        The client joins the key values with JS String(), which only matches Python's
+        str() for str and int values (not e.g. bools, floats or datetimes). Resources
+        with other key types always return the record IDs and fk_ values instead.
+        """
+        if request.query.get("format") != "columns":
+            return False
+        keys = {*self.primary_key, *(k for keys in self._foreign_rows for k in keys)}
+        return all(self._raw_record_type.get(k) in _PLAIN_KEY_TYPES for k in keys)
+
+    @final
+    def _columns_header(self, fields: Sequence[str]) -> dict[str, object]:
+        """Return the details needed by the client to rebuild records from rows.
+
+        The client derives the record IDs and fk_ values from the key fields, rather
+        than them being sent with every record.
+        """
+        return {"fields": fields, "primaryKey": self.primary_key,
+                "foreignKeys": sorted(self._foreign_rows)}
+
+    @final
+    def _rows(self, records: Sequence[Record], fields: Sequence[str]) -> list[object]:
+        """Convert records to arrays of values, ordered by fields.
+
+        Records without exactly these fields (e.g. due to field permissions) are left
+        as objects.
+        """
+        keys = set(fields)
+        return [[r[f] for f in fields] if r.keys() == keys else r for r in records]
+
+    @final
+    def _api_record(self, record: Record) -> APIRecord:
         foreign_keys = {fk(*keys): None if any(record[k] is None for k in keys)
                         else "|".join(str(record[k]) for k in keys)
                         for keys in self._foreign_rows if all(k in record for k in keys)}
@@ -410,37 +927,46 @@ class AbstractAdminResource(ABC, Generic[_ID]):
             **foreign_keys  # type: ignore[typeddict-item]
         }
 
+    @final
+    def _version_etag(self, request: web.Request, records: Sequence[Record],
+                      total: Optional[int] = None) -> Optional[str]:
+        """Return an ETag generated from the record versions, or None if not enabled."""
+        if self.version_field is None:
+            return None
+        permissions: CompiledPermissions = request["aiohttpadmin_permissions"]
+        h = hashlib.blake2b(digest_size=16)
+        # The response also depends on the query, format and the user's permissions.
+        h.update(f"{request.path_qs}\0{response_type(request)}\0{permissions.fingerprint}"
+                 f"\0{total}".encode())
+        for r in records:
+            key = tuple(r[pk] for pk in self.primary_key)
+            h.update(f"\0{key!r}:{r[self.version_field]!r}".encode())
+        return h.hexdigest()
+
     @final
     def _convert_ids(self, ids: Sequence[_ID]) -> tuple[str, ...]:
         """Convert IDs to correct output format."""
         return tuple(str(i) for i in ids)
 
     def _process_list_query(self, query: _ListQuery, request: web.Request) -> None:
+        """Finish a list query, whose filter has already been validated by _decoders."""
         # When sort order refers to "id", this should be translated to primary key.
         if query["sort"]["field"] == "id":
             query["sort"]["field"] = self.primary_key[0]
         else:
             query["sort"]["field"] = query["sort"]["field"].removeprefix("data.")
+        self._add_permission_filters(query["filter"], request)
 
-        query["filter"].update(check(dict[str, object], query["filter"].pop("data", {})))
-
-        merged_filter = {}
-        for k, v in query["filter"].items():
-            if k.startswith("fk_"):
-                v = check(str, v)
-                for c, cv in zip(k.removeprefix("fk_").split("__"), v.split("|")):
-                    merged_filter[c] = check(self._raw_record_type[c], cv)
-            else:
-                merged_filter[k] = check(self._raw_record_type[k], v)
-        query["filter"] = merged_filter
-
-        # Add filters from advanced permissions.
+    def _add_permission_filters(self, filters: dict[str, object],
+                                request: web.Request) -> None:
+        """Add filters from advanced permissions."""
         # The permissions will be cached on the request from a previous permissions check.
-        permissions = permissions_as_dict(request["aiohttpadmin_permissions"])
-        filters = permissions.get(f"admin.{self.name}.view",
-                                  permissions.get(f"admin.{self.name}.*", {}))
-        for k, v in filters.items():
-            query["filter"][k] = v
+        permissions: CompiledPermissions = request["aiohttpadmin_permissions"]
+        perm_filters = permissions.as_dict.get(
+            f"admin.{self.name}.view", permissions.as_dict.get(f"admin.{self.name}.*", {}))
+        for k, v in perm_filters.items():
+            # Copy, as the compiled permissions are shared between requests.
+            filters[k] = list(v)
 
     @cached_property
     def routes(self) -> tuple[web.RouteDef, ...]:
@@ -451,6 +977,7 @@ class AbstractAdminResource(ABC, Generic[_ID]):
         url = "/" + self.name
         return (
             web.get(url + "/list", self._get_list, name=self.name + "_get_list"),
+            web.get(url + "/count", self._get_count, name=self.name + "_get_count"),
             web.get(url + "/one", self._get_one, name=self.name + "_get_one"),
             web.get(url, self._get_many, name=self.name + "_get_many"),
             web.get(url + "/ref", self._get_many_ref, name=self.name + "_get_many_ref"),
@@ -3,17 +3,20 @@ import json
 import logging
 import operator
 import sys
-from collections.abc import Callable, Coroutine, Iterator, Sequence
+import time
+from collections import OrderedDict
+from collections.abc import AsyncGenerator, Callable, Coroutine, Iterator, Sequence
 from types import MappingProxyType as MPT
 from typing import Any, Literal, Optional, TypeVar, Union, cast
 
 import sqlalchemy as sa
 from aiohttp import web
-from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
 from sqlalchemy.orm import (DeclarativeBase, DeclarativeBaseNoMeta, Mapper,
                             QueryableAttribute, selectinload)
 
-from .abc import AbstractAdminResource, GetListParams, GetManyRefParams, Meta, Record
+from .abc import (AbstractAdminResource, ApproximateTotal, GetCountParams, GetListParams,
+                  GetManyRefParams, Meta, PartialTotal, Record)
 from ..types import FunctionState, comp, data, fk, func, regex
 
 if sys.version_info >= (3, 10):
@@ -28,6 +31,7 @@ _Filters = dict[Union[sa.Column[object], QueryableAttribute[Any]],
                 Union[_FValues, Sequence[_FValues]]]
 _ModelOrTable = Union[sa.Table, type[DeclarativeBase], type[DeclarativeBaseNoMeta]]
 _SABoolExpression = sa.sql.roles.ExpressionElementRole[bool]
+CountStrategy = Literal["exact", "inline", "cached", "estimate", "has_next"]
 # _RelationshipAttr = InstrumentedAttribute[Union[DeclarativeBase, DeclarativeBaseNoMeta]]
 
 logger = logging.getLogger(__name__)
@@ -163,9 +167,29 @@ def create_filters(columns: sa.ColumnCollection[str, sa.Column[object]],
 
 # ID is based on PK, which we can't infer from types, so must use Any here.
 class SAResource(AbstractAdminResource[tuple[Any, ...]]):
+    # Number of rows fetched from the cursor at a time by stream_list().
+    stream_chunk_size = 100
+    keyset_pagination = True
+    # Maximum number of filters to cache counts for, with count_strategy="cached".
+    count_cache_size = 100
+    # With count_strategy="estimate", smaller estimates are replaced by an exact count.
+    estimate_threshold = 10000
+
     _model: Union[type[DeclarativeBase], type[DeclarativeBaseNoMeta], None] = None
 
-    def __init__(self, db: AsyncEngine, model_or_table: _ModelOrTable):
+    def __init__(self, db: AsyncEngine, model_or_table: _ModelOrTable, *,
+                 version_field: Optional[str] = None, count_strategy: CountStrategy = "exact",
+                 count_ttl: float = 60):
+        """Create a resource for the given table or ORM model.
+
+        count_strategy sets how the total for list requests is found:
+            "exact": COUNT(*) on every request.
+            "inline": An exact count, fetched in the same query as the rows.
+            "cached": Exact counts, reused for count_ttl seconds for the same filters.
+            "estimate": The database's estimated number of rows for unfiltered lists.
+            "has_next": No total; fetches one extra row to see if there is a next page.
+        Cached and estimated totals are marked as approximate in the response.
+        """
         if isinstance(model_or_table, sa.Table):
             table = model_or_table
         else:
@@ -176,12 +200,21 @@ class SAResource(AbstractAdminResource[tuple[Any, ...]]):
 
         self._db = db
         self._table = table
+        self._count_strategy = count_strategy
+        # Inline counts are fetched with the rows, and has_next doesn't count at all.
+        self.deferred_count = count_strategy not in ("inline", "has_next")
+        self._count_ttl = count_ttl
+        self._count_cache: OrderedDict[str, tuple[float, int]] = OrderedDict()
         self.name = table.name
         self.primary_key = tuple(filter(lambda c: table.c[c].primary_key, self._table.c.keys()))
         if not self.primary_key:
             self.primary_key = tuple(self._table.c.keys())
         pk_types = tuple(table.c[pk].type.python_type for pk in self.primary_key)
         self._id_type = tuple.__class_getitem__(pk_types)  # type: ignore[assignment]
+        if version_field is not None:
+            if version_field not in table.c:
+                raise ValueError(f"Invalid version_field '{version_field}'.")
+            self.version_field = version_field
 
         self.fields = {}
         self.inputs = {}
@@ -298,29 +331,200 @@ class SAResource(AbstractAdminResource[tuple[Any, ...]]):
 
     @handle_errors
     async def get_list(self, params: GetListParams) -> tuple[list[Record], int]:
-        per_page = params["pagination"]["perPage"]
-        offset = (params["pagination"]["page"] - 1) * per_page
+        query, stmt = self._list_query(params)
+
+        if self._count_strategy == "has_next" or not params.get("count", True):
+            page, per_page = params["pagination"]["page"], params["pagination"]["perPage"]
+            # Fetch an extra row to find out if there is a next page, instead of counting.
+            async with self._db.connect() as conn:
+                result = await conn.execute(stmt.limit(per_page + 1))
+                records = [r._asdict() for r in result]
+            return records[:per_page], PartialTotal((page - 1) * per_page + len(records))
+
+        if self._count_strategy == "inline":
+            # Use a single connection, to reduce pool usage under load. An uncorrelated
+            # subquery is counted once, and unlike COUNT(*) OVER () doesn't need every
+            # matching row to be materialised before applying the limit.
+            async with self._db.connect() as conn:
+                result = await conn.execute(stmt.add_columns(self._count_stmt(query)
+                                                             .scalar_subquery()))
+                keys = tuple(result.keys())[:-1]
+                rows = result.all()
+                # Past the last page there are no rows to carry the total.
+                total: int = rows[0][-1] if rows else await self._exact_count(query, conn)
+            return [dict(zip(keys, r[:-1])) for r in rows], total
+
+        async def get_entities() -> list[Record]:
+            async with self._db.connect() as conn:
+                return [r._asdict() for r in await conn.execute(stmt)]
+
+        return await asyncio.gather(get_entities(), self._count(query, params["filter"]))
+
+    @handle_errors
+    async def stream_list(
+        self, params: GetListParams
+    ) -> tuple[AsyncGenerator[Sequence[Record], None], int]:
+        if self._count_strategy == "has_next" or not params.get("count", True):
+            # The extra row must be removed, so just fetch the page with get_list().
+            return await super().stream_list(params)
+
+        query, stmt = self._list_query(params)
 
-        filters = params["filter"]
+        async def chunks() -> AsyncGenerator[Sequence[Record], None]:
+            async with self._db.connect() as conn:
+                # Use a server-side cursor, so only one chunk of rows is held in memory.
+                stmt_opts = stmt.execution_options(yield_per=self.stream_chunk_size)
+                result = await conn.stream(stmt_opts)
+                try:
+                    async for rows in result.partitions():
+                        yield [r._asdict() for r in rows]
+                finally:
+                    # Close the cursor if the client disconnected before the end.
+                    await result.close()
+
+        return chunks(), await self._count(query, params["filter"])
+
+    def _list_query(self, params: GetListParams) -> tuple[sa.Select[Any], sa.Select[Any]]:
+        """Return the filtered query and the statement to fetch the requested page."""
+        per_page = params["pagination"]["perPage"]
+        query = self._filtered_query(params["filter"])
+        page_query = query
+        if "fields" in params:
+            # Only load the columns displayed, skipping any large hidden columns.
+            fields = set(params["fields"])
+            page_query = query.with_only_columns(*(c for c in self._table.c if c.key in fields))
+
+        ascending = params["sort"]["order"] == "ASC"
+        # The primary key breaks ties, so the order (and therefore paging) is stable.
+        keys = tuple(dict.fromkeys((params["sort"]["field"], *self.primary_key)))
+        columns = tuple(self._table.c[k] for k in keys)
+        sort_column = columns[0]
+        stmt = page_query.order_by(*self._order(columns, ascending)).limit(per_page)
+
+        cursor = params.get("cursor")
+        if cursor is None:
+            return query, stmt.offset((params["pagination"]["page"] - 1) * per_page)
+
+        # Keyset pagination: seek directly to the rows after the cursor using the index,
+        # rather than the database scanning and discarding every row before the offset.
+        values = dict(zip(self.primary_key, cursor.key))
+        values[params["sort"]["field"]] = cursor.value
+        cmp = operator.gt if ascending else operator.lt
+
+        def seek(cols: Sequence[sa.Column[Any]]) -> sa.ColumnElement[bool]:
+            position = (sa.literal(values[c.key], c.type) for c in cols)
+            return cast(sa.ColumnElement[bool], cmp(sa.tuple_(*cols), sa.tuple_(*position)))
+
+        nulls_last = self._nulls_last(ascending)
+        following = None
+        if cursor.value is None:
+            after = sa.and_(sort_column.is_(None), seek(columns[1:]))
+            if not nulls_last:
+                following = sort_column.is_not(None)
+        else:
+            after = seek(columns)
+            if sort_column.nullable and nulls_last:
+                following = sort_column.is_(None)
+        if following is None:
+            return query, stmt.where(after)
+
+        # The page may continue from the cursor's block of rows into the following block
+        # (nulls or non-nulls). A query for each block can still seek using the index.
+        # Each is limited to an extra row, for get_list() checking for a next page.
+        blocks = (stmt.where(after), stmt.where(following))
+        page = sa.union_all(*(sa.select(b.limit(per_page + 1).subquery()) for b in blocks))
+        page_sq = page.subquery()
+        order = self._order(tuple(page_sq.c[k] for k in keys), ascending)
+        return query, sa.select(page_sq).order_by(*order).limit(per_page)
+
+    def _nulls_last(self, ascending: bool) -> bool:
+        """Return True if the database sorts nulls after other values in this order."""
+        # PostgreSQL and Oracle treat null as the highest value, others as the lowest.
+        return ascending == (self._db.dialect.name in ("postgresql", "oracle"))
+
+    def _order(self, columns: Sequence[sa.ColumnElement[Any]],
+               ascending: bool) -> tuple[sa.ColumnElement[Any], ...]:
+        """Return the ORDER BY clauses to sort by columns.
+
+        Nulls are placed explicitly for keyset pagination, but in the database's default
+        position, so the order is unchanged and matches a default index.
+        """
+        sort_dir = sa.asc if ascending else sa.desc
+        order = [sort_dir(c) for c in columns]
+        # MySQL and SQL Server don't support NULLS FIRST/LAST (nulls are sorted lowest).
+        if columns[0].nullable and self._db.dialect.name not in ("mssql", "mysql", "mariadb"):
+            nulls_last = self._nulls_last(ascending)
+            order[0] = order[0].nulls_last() if nulls_last else order[0].nulls_first()
+        return tuple(order)
+
+    def _filtered_query(self, filters: dict[str, object]) -> sa.Select[Any]:
         query = sa.select(self._table)
         if filters:
             query = query.where(*create_filters(self._table.c, filters))
+        return query
 
-        async def get_count() -> int:
+    @handle_errors
+    async def get_count(self, params: GetCountParams) -> int:
+        return await self._count(self._filtered_query(params["filter"]), params["filter"])
+
+    async def _count(self, query: sa.Select[Any], filters: dict[str, object]) -> int:
+        """Return the total for a list query, according to the count strategy."""
+        if self._count_strategy == "estimate" and not filters:
+            estimate = await self._estimate_count()
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return ApproximateTotal(estimate)
+        elif self._count_strategy == "cached":
+            key = json.dumps(filters, sort_keys=True, default=str)
+            cached = self._count_cache.get(key)
+            if cached is not None and time.monotonic() - cached[0] < self._count_ttl:
+                return ApproximateTotal(cached[1])
+            count = await self._exact_count(query)
+            self._count_cache[key] = (time.monotonic(), count)
+            self._count_cache.move_to_end(key)
+            if len(self._count_cache) > self.count_cache_size:
+                self._count_cache.popitem(last=False)
+            return count
+
+        return await self._exact_count(query)
+
+    def _count_stmt(self, query: sa.Select[Any]) -> sa.Select[tuple[int]]:
+        return sa.select(sa.func.count()).select_from(query.subquery())
+
+    async def _exact_count(self, query: sa.Select[Any],
+                           conn: Optional[AsyncConnection] = None) -> int:
+        if conn is None:
             async with self._db.connect() as conn:
-                count = await conn.scalar(sa.select(sa.func.count()).select_from(query.subquery()))
-                if count is None:
-                    raise RuntimeError("Failed to get count.")
-                return count
+                return await self._exact_count(query, conn)
 
-        async def get_entities() -> list[Record]:
-            async with self._db.connect() as conn:
-                sort_dir = sa.asc if params["sort"]["order"] == "ASC" else sa.desc
-                order_by: sa.UnaryExpression[object] = sort_dir(params["sort"]["field"])
-                stmt = query.offset(offset).limit(per_page).order_by(order_by)
-                return [r._asdict() for r in await conn.execute(stmt)]
+        count = await conn.scalar(self._count_stmt(query))
+        if count is None:
+            raise RuntimeError("Failed to get count.")
+        return count
 
-        return await asyncio.gather(get_entities(), get_count())
+    async def _estimate_count(self) -> Optional[int]:
+        """Return the planner's estimate of the number of rows in the table, if available.
+
+        These statistics are updated by ANALYZE (or autovacuum in PostgreSQL).
+        """
+        async with self._db.connect() as conn:
+            dialect = conn.dialect.name
+            if dialect == "postgresql":
+                table = conn.dialect.identifier_preparer.format_table(self._table)
+                stmt = sa.text("SELECT reltuples FROM pg_class WHERE oid = CAST(:t AS regclass)")
+                estimate = await conn.scalar(stmt, {"t": table})
+                # reltuples is -1 if the table has never been analyzed.
+                return int(estimate) if estimate is not None and estimate >= 0 else None
+            if dialect == "sqlite":
+                exists = await conn.scalar(sa.text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"))
+                if not exists:
+                    return None
+                stmt = sa.text("SELECT stat FROM sqlite_stat1 WHERE tbl = :t")
+                result = await conn.execute(stmt, {"t": self._table.name})
+                # The first number of each stat is the number of rows in the table/index.
+                counts = [int(stat.split()[0]) for stat in result.scalars()]
+                return max(counts, default=None)
+        return None
 
     @handle_errors
     async def get_one(self, record_id: tuple[Any, ...], meta: Meta) -> Record:
@@ -0,0 +1,54 @@
+"""JSON codecs used to encode responses and decode requests.
+
+A codec can be passed to setup() to replace the default stdlib implementation.
+"""
+
+import json
+from abc import ABC, abstractmethod
+from datetime import date, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Union
+from uuid import UUID
+
+__all__ = ("AbstractJSONCodec", "Encoder", "StdlibJSONCodec")
+
+
+class AbstractJSONCodec(ABC):
+    @abstractmethod
+    def dumps(self, obj: object) -> bytes:
+        """Encode obj to JSON.
+
+        As well as the standard JSON types, this must handle date, time, datetime, Enum,
+        bytes, Decimal and UUID values.
+        """
+
+    @abstractmethod
+    def loads(self, data: Union[str, bytes]) -> Any:
+        """Decode JSON data, raising ValueError if invalid."""
+
+
+class Encoder(json.JSONEncoder):
+    def default(self, o: object) -> Any:
+        if isinstance(o, (date, time)):
+            return str(o)
+        if isinstance(o, Enum):
+            return o.value
+        if isinstance(o, bytes):
+            return o.decode(errors="replace")
+        if isinstance(o, Decimal):
+            return float(o)
+        if isinstance(o, UUID):
+            return str(o)
+
+        return super().default(o)
+
+
+class StdlibJSONCodec(AbstractJSONCodec):
+    """Codec using the stdlib json module, used by default."""
+
+    def dumps(self, obj: object) -> bytes:
+        return json.dumps(obj, cls=Encoder).encode()
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
@@ -0,0 +1,33 @@
+"""MessagePack codec, used for API responses when requested by the client.
+
+Values are encoded the same as StdlibJSONCodec, except bytes which are sent as binary
+(and decoded to text by the admin client).
+"""
+
+from datetime import date, time
+from decimal import Decimal
+from enum import Enum
+from uuid import UUID
+
+import msgpack
+
+CONTENT_TYPE = "application/msgpack"
+
+
+def _default(o: object) -> object:
+    if isinstance(o, (date, time)):
+        return str(o)
+    if isinstance(o, Enum):
+        return o.value
+    if isinstance(o, Decimal):
+        return float(o)
+    if isinstance(o, UUID):
+        return str(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not MessagePack serializable")
+
+
+class MsgpackCodec:
+    """Codec using the msgpack package."""
+
+    def dumps(self, obj: object) -> bytes:
+        return msgpack.packb(obj, default=_default, datetime=False)  # type: ignore[no-any-return]
@@ -0,0 +1,34 @@
+from decimal import Decimal
+from typing import Any, Union
+
+import orjson
+
+from . import AbstractJSONCodec
+
+
+def _default(o: object) -> object:
+    # Other types are handled natively by orjson.
+    if isinstance(o, Decimal):
+        return float(o)
+    if isinstance(o, bytes):
+        return o.decode(errors="replace")
+    raise TypeError
+
+
+class OrjsonCodec(AbstractJSONCodec):
+    """Codec using orjson, which natively encodes date/time, Enum and UUID values.
+
+    Note that datetimes are encoded in ISO 8601 format (e.g. '2023-01-02T03:04:00').
+
+    Args:
+        option - Extra orjson options (e.g. orjson.OPT_NAIVE_UTC).
+    """
+
+    def __init__(self, option: int = 0):
+        self._option = option
+
+    def dumps(self, obj: object) -> bytes:
+        return orjson.dumps(obj, default=_default, option=self._option)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return orjson.loads(data)
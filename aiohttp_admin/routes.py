@@ -1,13 +1,15 @@
 """Setup routes for admin app."""
 
 import copy
+import json
 from pathlib import Path
 
 from aiohttp import web
 
 from . import views
 from .backends.abc import AbstractAdminResource
-from .types import Schema, _ResourceState, data, resources_key, state_key
+from .types import (Schema, StaticAssets, _ResourceState, data, resources_key, state_key,
+                    static_assets_key)
 
 
 def setup_resources(admin: web.Application, schema: Schema) -> None:
@@ -53,14 +55,32 @@ def setup_resources(admin: web.Application, schema: Schema) -> None:
             "fields": fields, "inputs": inputs, "list_omit": tuple(omit_fields),
             "repr": repr_field, "label": r.get("label"), "icon": r.get("icon"),
             "bulk_update": r.get("bulk_update", {}), "urls": {},
-            "show_actions": r.get("show_actions", ())}
+            "show_actions": r.get("show_actions", ()), "deferred_count": m.deferred_count}
         admin[state_key]["resources"][m.name] = state
     admin[resources_key] = resources
 
 
+def load_static_assets(static: Path) -> StaticAssets:
+    """Find the admin JS bundle from the manifest written by the build."""
+    try:
+        manifest = json.loads((static / ".vite" / "manifest.json").read_text())
+    except FileNotFoundError:
+        # Not built with a manifest (e.g. an old or development build).
+        return {"entry": "admin.js", "hashed": frozenset()}
+
+    chunks = manifest.values()
+    hashed = frozenset(f for c in chunks for f in (c["file"], *c.get("css", ())))
+    entry = next(c["file"] for c in chunks if c.get("isEntry"))
+    return {"entry": entry, "hashed": hashed | {f + ".map" for f in hashed}}
+
+
 def setup_routes(admin: web.Application) -> None:
     """Add routes to the admin application."""
+    static = Path(__file__).with_name("static")
+    admin[static_assets_key] = load_static_assets(static)
+    admin.on_response_prepare.append(views.static_cache_headers)
+
     admin.router.add_get("", views.index, name="index")
     admin.router.add_post("/token", views.token, name="token")
     admin.router.add_delete("/logout", views.logout, name="logout")
-    admin.router.add_static("/static", path=Path(__file__).with_name("static"), name="static")
+    admin.router.add_static("/static", path=static, name="static")
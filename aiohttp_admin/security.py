@@ -1,11 +1,23 @@
+import asyncio
+import base64
+import hashlib
+import hmac
 import json
-from collections.abc import Collection, Mapping, Sequence
+import math
+import os
+import secrets
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Collection, Iterable, Mapping, Sequence
+from concurrent.futures import Executor
 from enum import Enum
-from functools import lru_cache
-from typing import Optional, Type, TypeVar, Union
+from functools import cached_property, lru_cache, partial
+from typing import NamedTuple, Optional, Type, TypeVar, Union
 
 from aiohttp import web
 from aiohttp_security import AbstractAuthorizationPolicy, SessionIdentityPolicy
+from aiohttp_security.api import AUTZ_KEY
 from cryptography.fernet import Fernet, InvalidToken
 from pydantic import Json, TypeAdapter, ValidationError
 
@@ -72,10 +84,274 @@ def permissions_as_dict(permissions: Collection[str]) -> dict[str, dict[str, lis
     return p_dict
 
 
+_Filters = tuple[tuple[str, tuple[object, ...]], ...]
+
+
+class CompiledPermissions:
+    """A set of permissions preprocessed for fast, repeated checks.
+
+    Each permission checked is resolved once (applying negations and wildcards) to the
+    permission which grants it, if any. These results are memoised, so subsequent checks
+    are a dict lookup plus comparing any precomputed filters.
+    """
+
+    def __init__(self, permissions: Collection[str]):
+        self.as_dict = permissions_as_dict(permissions)
+        self._filters = {perm: tuple((attr, tuple(vals)) for attr, vals in filters.items())
+                         for perm, filters in self.as_dict.items() if not perm.startswith("~")}
+        self._matches: dict[Union[str, Enum], Optional[str]] = {}
+
+    @cached_property
+    def fingerprint(self) -> str:
+        """A hash identifying this set of permissions."""
+        data = json.dumps(self.as_dict, sort_keys=True).encode()
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def match(self, p: Union[str, Enum]) -> Optional[str]:
+        """Return the permission which grants p, or None if not permitted."""
+        try:
+            return self._matches[p]
+        except KeyError:
+            perm = self._matches[p] = self._resolve(p)
+            return perm
+
+    def rule(self, p: Union[str, Enum]) -> Optional[_Filters]:
+        """Return the filters required for permission p, or None if not permitted."""
+        perm = self.match(p)
+        return None if perm is None else self._filters[perm]
+
+    def permits(self, p: Union[str, Enum], context: Optional[Mapping[str, object]] = None) -> bool:
+        """Equivalent to has_permission(), but using the precomputed rules."""
+        filters = self.rule(p)
+        return filters is not None and _match_filters(filters, context)
+
+    def filter_fields(self, prefix: str, perm_type: str,
+                      records: Sequence[Mapping[str, object]],
+                      contexts: Optional[Sequence[Mapping[str, object]]] = None
+                      ) -> list[dict[str, object]]:
+        """Return copies of records containing only the permitted fields.
+
+        Each field is checked against the f"{prefix}.{field}.{perm_type}" permission.
+        Fields without filters are resolved once for all records, while filtered
+        permissions are evaluated once per record (using the matching item in contexts
+        if given) and shared between all fields granted by that permission.
+        """
+        if contexts is None:
+            contexts = records
+
+        masks: dict[str, list[bool]] = {}
+        # None means the field is visible in every record.
+        visible: dict[str, Optional[list[bool]]] = {}
+        for k in dict.fromkeys(k for r in records for k in r):
+            perm = self.match(f"{prefix}.{k}.{perm_type}")
+            if perm is None:
+                continue
+            filters = self._filters[perm]
+            if not filters:
+                visible[k] = None
+                continue
+            mask = masks.get(perm)
+            if mask is None:
+                mask = masks[perm] = [_match_filters(filters, c) for c in contexts]
+            visible[k] = mask
+
+        if not masks:
+            return [{k: v for k, v in r.items() if k in visible} for r in records]
+        return [{k: v for k, v in r.items()
+                 if k in visible and ((mask := visible[k]) is None or mask[i])}
+                for i, r in enumerate(records)]
+
+    def _resolve(self, p: Union[str, Enum]) -> Optional[str]:
+        # TODO(PY311): StrEnum
+        *parts, ptype = p.split(".")  # type: ignore[union-attr]
+        candidates = tuple(".".join((*parts[:i], t))
+                           for i in range(len(parts), 0, -1) for t in (ptype, "*"))
+
+        # Negative permissions.
+        if any("~" + perm in self.as_dict for perm in candidates):
+            return None
+
+        # Positive permissions.
+        return next((perm for perm in candidates if perm in self._filters), None)
+
+
+def _match_filters(filters: _Filters, context: Optional[Mapping[str, object]]) -> bool:
+    return not context or all(context.get(attr) in vals for attr, vals in filters)
+
+
+@lru_cache(maxsize=256)
+def _compile_permissions(permissions: frozenset[str]) -> CompiledPermissions:
+    return CompiledPermissions(permissions)
+
+
+def compile_permissions(permissions: Collection[str]) -> CompiledPermissions:
+    """Return compiled permissions, reusing the result for identical permission sets."""
+    return _compile_permissions(frozenset(permissions))
+
+
+async def _default_identity_callback(identity: str) -> UserDetails:
+    return {"permissions": (Permissions.all,)}
+
+
+class ParsedPermission(NamedTuple):
+    negated: bool
+    resource: Optional[str]
+    field: Optional[str]
+    type: str
+    filters: tuple[tuple[str, str], ...]
+
+
+_PERMISSION_TYPES = frozenset(("view", "edit", "add", "delete", "*"))
+
+
+class PermissionParser:
+    """Validate permission strings against the resources and fields in the admin.
+
+    Valid permissions look like 'admin.resource.field.type|field=value', where the
+    resource, field and filters are optional and filter values are JSON numbers or
+    strings. Global and negated permissions can't have filters.
+    """
+
+    def __init__(self, fields: Mapping[str, Collection[str]]):
+        self._fields = {r: frozenset(f) for r, f in fields.items()}
+
+    def parse(self, permission: str) -> Optional[ParsedPermission]:
+        """Return the parsed permission, or None if it is not valid."""
+        head, sep, rest = permission.partition("|")
+        negated = head.startswith("~")
+        admin, *path = head.removeprefix("~").split(".")
+        if admin != "admin" or not path or path[-1] not in _PERMISSION_TYPES:
+            return None
+        *path, p_type = path
+
+        if not path:
+            return None if sep else ParsedPermission(negated, None, None, p_type, ())
+
+        # Names may contain dots, so try each split between resource and field.
+        for i in range(len(path), 0, -1):
+            resource = ".".join(path[:i])
+            fields = self._fields.get(resource)
+            field = ".".join(path[i:]) if i < len(path) else None
+            if fields is None or (field is not None and field not in fields):
+                continue
+            if not sep:
+                return ParsedPermission(negated, resource, field, p_type, ())
+            filters = None if negated else _parse_filters(rest, 0, fields, {})
+            if filters is not None:
+                return ParsedPermission(negated, resource, field, p_type, filters)
+        return None
+
+    # Same behaviour as re.Pattern.fullmatch(), which was previously used for validation.
+    fullmatch = parse
+
+
+_ParsedFilters = Optional[tuple[tuple[str, str], ...]]
+
+
+def _parse_filters(filters: str, pos: int, fields: frozenset[str],
+                   memo: dict[int, _ParsedFilters]) -> _ParsedFilters:
+    """Parse 'field=value|field=value...' from pos to the end of filters."""
+    if pos in memo:
+        return memo[pos]
+
+    result: _ParsedFilters = None
+    eq = filters.find("=", pos)
+    field = filters[pos:eq]
+    if eq != -1 and field in fields:
+        start = eq + 1
+        if filters.startswith('"', start):
+            # A string may contain '|' and '"', so try each possible closing quote.
+            end = filters.find('"', start + 1)
+            newline = filters.find("\n", start)
+            while result is None and end != -1 and (newline == -1 or end < newline):
+                value = filters[start:end + 1]
+                if end + 1 == len(filters):
+                    result = ((field, value),)
+                elif filters[end + 1] == "|":
+                    rest = _parse_filters(filters, end + 2, fields, memo)
+                    result = None if rest is None else ((field, value), *rest)
+                end = filters.find('"', end + 1)
+        else:
+            end = filters.find("|", start)
+            value = filters[start:] if end == -1 else filters[start:end]
+            if value.isdecimal():
+                if end == -1:
+                    result = ((field, value),)
+                else:
+                    rest = _parse_filters(filters, end + 1, fields, memo)
+                    result = None if rest is None else ((field, value), *rest)
+
+    memo[pos] = result
+    return result
+
+
+class IdentityCache:
+    """Cache of identity_callback results, shared across requests.
+
+    Results are kept for ttl seconds (for up to maxsize identities). Concurrent lookups
+    for the same identity share a single callback call, even when ttl is 0.
+    """
+
+    def __init__(self, callback: Optional[Callable[[str], Awaitable[UserDetails]]] = None,
+                 *, ttl: float = 0, maxsize: int = 1024):
+        self.hits = 0
+        self.misses = 0
+        self._callback = callback or _default_identity_callback
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._cache: OrderedDict[str, tuple[float, UserDetails]] = OrderedDict()
+        self._pending: dict[str, asyncio.Future[UserDetails]] = {}
+
+    async def get(self, identity: str) -> UserDetails:
+        """Return the user details for identity."""
+        entry = self._cache.get(identity)
+        if entry is not None:
+            expires, user = entry
+            if expires > time.monotonic():
+                self._cache.move_to_end(identity)
+                self.hits += 1
+                return user
+            del self._cache[identity]
+
+        fut = self._pending.get(identity)
+        if fut is None:
+            self.misses += 1
+            fut = asyncio.ensure_future(self._callback(identity))
+            self._pending[identity] = fut
+            fut.add_done_callback(partial(self._store, identity))
+        else:
+            self.hits += 1
+        # Shield, so a cancelled request doesn't cancel the lookup for other requests.
+        return await asyncio.shield(fut)
+
+    def invalidate(self, identity: Optional[str] = None) -> None:
+        """Remove identity (or all identities if None) from the cache."""
+        if identity is None:
+            self._cache.clear()
+            self._pending.clear()
+        else:
+            self._cache.pop(identity, None)
+            self._pending.pop(identity, None)
+
+    def _store(self, identity: str, fut: asyncio.Future[UserDetails]) -> None:
+        failed = fut.cancelled() or fut.exception() is not None
+        # Don't store results which were invalidated while the lookup was in progress.
+        if self._pending.get(identity) is not fut:
+            return
+        del self._pending[identity]
+
+        if failed or self._ttl <= 0:
+            return
+        self._cache[identity] = (time.monotonic() + self._ttl, fut.result())
+        self._cache.move_to_end(identity)
+        while len(self._cache) > self._maxsize:
+            self._cache.popitem(last=False)
+
+
 class AdminAuthorizationPolicy(AbstractAuthorizationPolicy):
-    def __init__(self, schema: Schema):
+    def __init__(self, identity_cache: IdentityCache):
         super().__init__()
-        self._identity_callback = schema["security"].get("identity_callback")
+        self._identity_cache = identity_cache
 
     async def authorized_userid(self, identity: str) -> str:
         return identity
@@ -94,46 +370,217 @@ class AdminAuthorizationPolicy(AbstractAuthorizationPolicy):
         except (TypeError, ValueError):
             raise TypeError("Context must be `(request, record)` or `(request, None)`")
 
-        permissions: Optional[Collection[str]] = request.get("aiohttpadmin_permissions")
+        permissions: Optional[CompiledPermissions] = request.get("aiohttpadmin_permissions")
         if permissions is None:
-            if self._identity_callback is None:
-                permissions = (Permissions.all,)
-            else:
-                user = await self._identity_callback(identity)
-                permissions = user["permissions"]
-            # Cache permissions per request to avoid potentially dozens of DB calls.
+            user = await self._identity_cache.get(identity)
+            # Cache permissions per request to avoid potentially dozens of lookups.
+            permissions = compile_permissions(user["permissions"])
             request["aiohttpadmin_permissions"] = permissions
-        return has_permission(permission, permissions_as_dict(permissions), record)
+        return permissions.permits(permission, record)
+
+    def permits_many(self, request: web.Request, permission: Union[str, Enum],
+                     records: Iterable[Mapping[str, object]]) -> bool:
+        """Return True if permission is granted for every one of records.
+
+        Unlike permits(), this is synchronous and resolves the permission only once, so
+        it must be called after permits() has been used for the request.
+        """
+        permissions: CompiledPermissions = request["aiohttpadmin_permissions"]
+        filters = permissions.rule(permission)
+        return filters is not None and all(_match_filters(filters, r) for r in records)
+
+    def permits_all(self, request: web.Request, permissions: Iterable[Union[str, Enum]],
+                    record: Optional[Mapping[str, object]]) -> bool:
+        """Return True if every one of permissions is granted for record.
+
+        Like permits_many(), this must be called after permits() has been used.
+        """
+        compiled: CompiledPermissions = request["aiohttpadmin_permissions"]
+        return all(compiled.permits(p, record) for p in permissions)
+
+
+def admin_policy(request: web.Request) -> AdminAuthorizationPolicy:
+    """Return the admin authorization policy for request."""
+    policy = request.config_dict[AUTZ_KEY]
+    if not isinstance(policy, AdminAuthorizationPolicy):
+        raise TypeError("Admin authorization policy has not been setup.")
+    return policy
+
+
+class TokenSerializer(ABC):
+    """Creates and validates the auth tokens given to the admin client."""
+
+    @abstractmethod
+    def dumps(self, data: str) -> str:
+        """Return a new token containing data."""
+
+    @abstractmethod
+    def loads(self, token: str, ttl: Optional[int]) -> Optional[tuple[str, int]]:
+        """Return the data and creation timestamp of a valid token, otherwise None."""
+
+
+class FernetToken(TokenSerializer):
+    """Encrypted (Fernet) tokens."""
+
+    def __init__(self, fernet: Fernet):
+        self._fernet = fernet
+
+    def dumps(self, data: str) -> str:
+        return self._fernet.encrypt(data.encode("utf-8")).decode("utf-8")
+
+    def loads(self, token: str, ttl: Optional[int]) -> Optional[tuple[str, int]]:
+        try:
+            data = self._fernet.decrypt(token, ttl=ttl).decode("utf-8")
+        except InvalidToken:
+            return None
+        return data, self._fernet.extract_timestamp(token)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+class SignedToken(TokenSerializer):
+    """Compact HMAC-SHA256 signed tokens.
+
+    The data is not encrypted, so can be read by the client. Tokens have the format
+    "<key id>.<timestamp>.<base64 data>.<base64 signature>". New tokens are signed with
+    the first secret, while tokens signed with any of the secrets are accepted, which
+    allows secrets to be rotated without logging out users.
+    """
+
+    def __init__(self, secrets: Sequence[bytes], *, purpose: bytes = b"token"):
+        if not secrets:
+            raise ValueError("At least one secret is required.")
+        self._keys: dict[str, bytes] = {}
+        for secret in secrets:
+            # Derive a key per purpose, so the secret is not reused for other purposes.
+            key = hmac.new(secret, b"aiohttp-admin " + purpose, hashlib.sha256).digest()
+            self._keys.setdefault(hashlib.sha256(key).hexdigest()[:8], key)
+        self._key_id = next(iter(self._keys))
+
+    def dumps(self, data: str) -> str:
+        msg = "{}.{}.{}".format(self._key_id, int(time.time()), _b64encode(data.encode("utf-8")))
+        return f"{msg}.{self._sign(self._keys[self._key_id], msg)}"
+
+    def loads(self, token: str, ttl: Optional[int]) -> Optional[tuple[str, int]]:
+        msg, _, signature = token.rpartition(".")
+        key = self._keys.get(msg.partition(".")[0])
+        if key is None:
+            return None
+        if not hmac.compare_digest(self._sign(key, msg).encode(), signature.encode("utf-8")):
+            return None
+
+        _key_id, timestamp, data = msg.split(".")
+        created = int(timestamp)
+        if ttl is not None and created + ttl < time.time():
+            return None
+        return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4)).decode("utf-8"), created
+
+    def _sign(self, key: bytes, msg: str) -> str:
+        return _b64encode(hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest())
+
+
+class _VerifiedToken(NamedTuple):
+    identity: str
+    # Time at which the token expires.
+    expires: Optional[float]
+    # Permissions from the token's claims, which can be trusted until permissions_expire.
+    permissions: Optional[CompiledPermissions]
+    permissions_expire: float
 
 
 class TokenIdentityPolicy(SessionIdentityPolicy):
-    def __init__(self, fernet: Fernet, schema: Schema):
+    def __init__(self, token: TokenSerializer, schema: Schema, identity_cache: IdentityCache,
+                 cookie_name: str, claims: Optional[SignedToken] = None):
         super().__init__()
-        self._fernet = fernet
-        config = schema["security"]
-        self._identity_callback = config.get("identity_callback")
-        self._max_age = config.get("max_age")
+        self._token = token
+        self._identity_cache = identity_cache
+        self._cookie_name = cookie_name
+        self._max_age = schema["security"].get("max_age")
+        self._token_cache_size = schema["security"].get("token_cache_size", 0)
+        self._token_cache_ttl = schema["security"].get("token_cache_ttl", 10)
+        # Verified tokens, with the time they can be cached until.
+        self._token_cache: OrderedDict[tuple[str, str],
+                                       tuple[float, _VerifiedToken]] = OrderedDict()
+        self._claims = claims
+        self._claims_ttl = schema["security"].get("permission_claims_ttl", 0)
 
     async def identify(self, request: web.Request) -> Optional[str]:
         """Return the identity of an authorised user."""
-        # Validate JS token
         hdr = request.headers.get("Authorization")
+        cookie = request.cookies.get(self._cookie_name)
+        key = (hdr, cookie) if self._token_cache_size and hdr and cookie else None
+        verified = None
+        if key is not None:
+            entry = self._token_cache.get(key)
+            if entry is not None:
+                if entry[0] > time.time():
+                    self._token_cache.move_to_end(key)
+                    verified = entry[1]
+                else:
+                    del self._token_cache[key]
+
+        if verified is None:
+            verified = await self._verify(request, hdr)
+            if verified is None:
+                return None
+            if key is not None:
+                # The session isn't loaded on a cache hit, so a server-side logout (e.g.
+                # in another worker) only takes effect once the entry expires.
+                until = time.time() + self._token_cache_ttl
+                if verified.expires is not None:
+                    until = min(until, verified.expires)
+                self._token_cache[key] = (until, verified)
+                while len(self._token_cache) > self._token_cache_size:
+                    self._token_cache.popitem(last=False)
+
+        if verified.permissions is not None and verified.permissions_expire > time.time():
+            # Trust the permission claims, avoiding a call to identity_callback.
+            request.setdefault("aiohttpadmin_permissions", verified.permissions)
+        elif self._claims is not None and "aiohttpadmin_claims" not in request:
+            # Claims are missing or expired, re-issue them (sent in an X-Claims header).
+            user = await self._identity_cache.get(verified.identity)
+            claims = (verified.identity, tuple(user["permissions"]))
+            request["aiohttpadmin_claims"] = self._claims.dumps(json.dumps(claims))
+            request.setdefault("aiohttpadmin_permissions",
+                               compile_permissions(user["permissions"]))
+        return verified.identity
+
+    async def _verify(self, request: web.Request,
+                      hdr: Optional[str]) -> Optional[_VerifiedToken]:
+        # Validate JS token
         try:
             identity_data = check(Json[IdentityDict], hdr)
         except ValidationError:
             return None
 
-        auth = identity_data["auth"].encode("utf-8")
-        try:
-            token_identity = self._fernet.decrypt(auth, ttl=self._max_age).decode("utf-8")
-        except InvalidToken:
+        token = self._token.loads(identity_data["auth"], self._max_age)
+        if token is None:
             return None
+        token_identity, created = token
 
         # Validate cookie token
         cookie_identity = await super().identify(request)
 
         # Both identites must match.
-        return token_identity if token_identity == cookie_identity else None
+        if token_identity != cookie_identity:
+            return None
+
+        permissions = None
+        permissions_expire = 0
+        claims = identity_data.get("claims")
+        if self._claims is not None and claims:
+            claims_data = self._claims.loads(claims, self._claims_ttl)
+            if claims_data is not None:
+                identity, user_permissions = json.loads(claims_data[0])
+                if identity == token_identity:
+                    permissions = compile_permissions(user_permissions)
+                    permissions_expire = claims_data[1] + self._claims_ttl
+
+        # The cookie is created at the same time as the token, so expires with it.
+        expires = None if self._max_age is None else created + self._max_age
+        return _VerifiedToken(token_identity, expires, permissions, permissions_expire)
 
     async def remember(self, request: web.Request, response: web.StreamResponse,
                        identity: str, **kwargs: object) -> None:
@@ -147,6 +594,10 @@ class TokenIdentityPolicy(SessionIdentityPolicy):
 
     async def forget(self, request: web.Request, response: web.StreamResponse) -> None:
         """Delete session cookie (JS client should choose to delete its token)."""
+        hdr = request.headers.get("Authorization")
+        cookie = request.cookies.get(self._cookie_name)
+        if hdr and cookie:
+            self._token_cache.pop((hdr, cookie), None)
         await super().forget(request, response)
 
     async def user_identity_dict(self, request: web.Request, identity: str) -> IdentityDict:
@@ -160,17 +611,140 @@ class TokenIdentityPolicy(SessionIdentityPolicy):
 
         All details (except auth) can be specified using the identity callback.
         """
-        if self._identity_callback is None:
-            user_details: UserDetails = {"permissions": (Permissions.all,)}
-        else:
-            user_details = await self._identity_callback(identity)
-            if "auth" in user_details:
-                raise ValueError("Callback should not return a dict with 'auth' key.")
+        # Always fetch fresh details on login.
+        self._identity_cache.invalidate(identity)
+        user_details = await self._identity_cache.get(identity)
+        if "auth" in user_details:
+            raise ValueError("Callback should not return a dict with 'auth' key.")
 
-        auth = self._fernet.encrypt(identity.encode("utf-8")).decode("utf-8")
+        auth = self._token.dumps(identity)
         identity_dict: IdentityDict = {"auth": auth, "fullName": "Admin user", "permissions": {}}
         # We change type of permissions below, so need to ignore this type error.
         identity_dict.update(user_details)  # type: ignore[typeddict-item]
         identity_dict["permissions"] = permissions_as_dict(user_details["permissions"])
+        if self._claims is not None:
+            claims = (identity, tuple(user_details["permissions"]))
+            identity_dict["claims"] = self._claims.dumps(json.dumps(claims))
 
         return identity_dict
+
+
+_PBKDF2_ITERATIONS = 600_000
+
+
+def hash_password(password: str, *, iterations: int = _PBKDF2_ITERATIONS) -> str:
+    """Hash a password with PBKDF2-SHA256, for checking with verify_password()."""
+    salt = secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return "pbkdf2_sha256${}${}${}".format(iterations, _b64encode(salt), _b64encode(digest))
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    """Check a password against a hash from hash_password().
+
+    This is CPU intensive, so should be run through a PasswordVerifier.
+    """
+    try:
+        algorithm, iterations, salt, digest = hashed.split("$")
+        if algorithm != "pbkdf2_sha256":
+            return False
+        expected = base64.urlsafe_b64decode(digest + "==")
+        result = hashlib.pbkdf2_hmac("sha256", password.encode(),
+                                     base64.urlsafe_b64decode(salt + "=="), int(iterations))
+    except ValueError:
+        return False
+    return hmac.compare_digest(result, expected)
+
+
+class PasswordVerifier:
+    """Verify password hashes in an executor, keeping the event loop responsive.
+
+    Args:
+        verify - Function receiving (password, hashed) and returning True if they match.
+            Must be picklable (i.e. a module-level function) for a process pool.
+            This can wrap other libraries, e.g. bcrypt.checkpw().
+        executor - Executor to run verify in, defaults to the loop's thread pool. A
+            ProcessPoolExecutor avoids holding the GIL for pure Python hashes.
+        max_concurrency - Maximum number of hashes verified at once, further logins
+            wait for a free slot. Defaults to the number of CPUs.
+
+    Intended to be used within check_credentials, e.g.:
+        verifier = PasswordVerifier()
+
+        async def check_credentials(username: str, password: str) -> bool:
+            user = await get_user(username)
+            return user is not None and await verifier(password, user.password_hash)
+    """
+
+    def __init__(self, verify: Callable[[str, str], bool] = verify_password, *,
+                 executor: Optional[Executor] = None, max_concurrency: Optional[int] = None):
+        self._verify = verify
+        self._executor = executor
+        self._max_concurrency = max_concurrency or os.cpu_count() or 1
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def __call__(self, password: str, hashed: str) -> bool:
+        loop = asyncio.get_running_loop()
+        # The verifier is usually created at import time, but a semaphore must be created
+        # in (and is bound to) the loop it is used in.
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+            self._loop = loop
+        async with self._semaphore:
+            return await loop.run_in_executor(self._executor, self._verify, password, hashed)
+
+
+class LoginThrottle:
+    """Limit the number of failed login attempts for each username and IP address.
+
+    Attempts are counted in fixed windows of window seconds. Each attempt is reserved
+    before the credentials are checked, so concurrent attempts can't exceed the limits,
+    and released by succeeded(), which also clears the count for that username.
+    """
+
+    def __init__(self, *, per_username: int, per_ip: int, window: int,
+                 maxsize: int = 10000):
+        self._limits = {"username": per_username, "ip": per_ip}
+        self._window = window
+        self._maxsize = maxsize
+        # (kind, value) -> (window start, failed attempts)
+        self._attempts: OrderedDict[tuple[str, str], tuple[float, int]] = OrderedDict()
+
+    def _keys(self, username: str, ip: Optional[str]) -> Iterable[tuple[str, str]]:
+        if self._limits["username"]:
+            yield ("username", username)
+        if self._limits["ip"] and ip:
+            yield ("ip", ip)
+
+    def attempt(self, username: str, ip: Optional[str]) -> int:
+        """Reserve a login attempt, counted as failed unless succeeded() is called.
+
+        Returns seconds until a login may be attempted, or 0 if allowed now (in which
+        case the attempt has been reserved).
+        """
+        now = time.monotonic()
+        wait = 0.
+        keys = tuple(self._keys(username, ip))
+        for key in keys:
+            start, count = self._attempts.get(key, (now, 0))
+            if start + self._window <= now:
+                self._attempts.pop(key, None)
+            elif count >= self._limits[key[0]]:
+                wait = max(wait, start + self._window - now)
+        if wait:
+            return math.ceil(wait)
+
+        for key in keys:
+            start, count = self._attempts.pop(key, (now, 0))
+            self._attempts[key] = (start, count + 1)
+        while len(self._attempts) > self._maxsize:
+            self._attempts.popitem(last=False)
+        return 0
+
+    def succeeded(self, username: str, ip: Optional[str]) -> None:
+        """Release the attempt of a successful login and clear the user's failures."""
+        self._attempts.pop(("username", username), None)
+        if ip and ("ip", ip) in self._attempts:
+            start, count = self._attempts[("ip", ip)]
+            self._attempts[("ip", ip)] = (start, count - 1)
@@ -0,0 +1,187 @@
+"""Server-side session storages.
+
+The session cookie only holds a random key, so loading a session is a dictionary or
+indexed-row lookup, rather than decrypting the cookie on every request.
+"""
+
+import asyncio
+import os
+import secrets
+import sqlite3
+import time
+from abc import abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, TypeVar, Union
+
+from aiohttp import web
+from aiohttp_session import AbstractStorage, Session
+
+__all__ = ("MemoryStorage", "SQLiteStorage", "ServerSideStorage")
+
+_T = TypeVar("_T")
+
+
+class ServerSideStorage(AbstractStorage):
+    """Base class for storages which keep the session data on the server.
+
+    A new key is issued every time the session is saved, so a key seen before login
+    can not be used to access the logged in session. When max_age is None, the cookie
+    lasts for the browser session, but the server can't tell when that ends, so the
+    stored session expires after session_ttl seconds (30 days by default).
+    """
+
+    def __init__(self, *, cookie_name: str = "AIOHTTP_SESSION", max_age: Optional[int] = None,
+                 secure: bool = True, samesite: str = "Strict", session_ttl: int = 2592000):
+        super().__init__(cookie_name=cookie_name, max_age=max_age, secure=secure,
+                         httponly=True, samesite=samesite)
+        self._session_ttl = session_ttl
+
+    @abstractmethod
+    async def load(self, key: str) -> Optional[str]:
+        """Return the data stored for key, or None if missing or expired."""
+
+    @abstractmethod
+    async def save(self, key: str, data: str, max_age: Optional[int]) -> None:
+        """Store data under key, expiring after max_age seconds."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove key from the storage."""
+
+    async def load_session(self, request: web.Request) -> Session:
+        key = self.load_cookie(request)
+        if key is not None:
+            data = await self.load(key)
+            if data is not None:
+                try:
+                    return Session(key, data=self._decoder(data), new=False,
+                                   max_age=self.max_age)
+                except ValueError:
+                    pass
+        return Session(None, data=None, new=True, max_age=self.max_age)
+
+    async def save_session(self, request: web.Request, response: web.StreamResponse,
+                           session: Session) -> None:
+        if session.identity is not None:
+            await self.delete(session.identity)
+        if session.empty:
+            self.save_cookie(response, "", max_age=session.max_age)
+            return
+
+        key = secrets.token_urlsafe(32)
+        max_age = self._session_ttl if session.max_age is None else session.max_age
+        await self.save(key, self._encoder(self._get_session_data(session)), max_age)
+        self.save_cookie(response, key, max_age=session.max_age)
+
+
+class MemoryStorage(ServerSideStorage):
+    """Store sessions in the process, discarding the least recently used.
+
+    Only suitable when running a single worker process.
+    """
+
+    def __init__(self, *, maxsize: int = 10000, cookie_name: str = "AIOHTTP_SESSION",
+                 max_age: Optional[int] = None, secure: bool = True,
+                 samesite: str = "Strict", session_ttl: int = 2592000):
+        super().__init__(cookie_name=cookie_name, max_age=max_age, secure=secure,
+                         samesite=samesite, session_ttl=session_ttl)
+        self._maxsize = maxsize
+        self._sessions: OrderedDict[str, tuple[Optional[float], str]] = OrderedDict()
+
+    async def load(self, key: str) -> Optional[str]:
+        value = self._sessions.get(key)
+        if value is None:
+            return None
+        expires, data = value
+        if expires is not None and expires <= time.time():
+            del self._sessions[key]
+            return None
+        self._sessions.move_to_end(key)
+        return data
+
+    async def save(self, key: str, data: str, max_age: Optional[int]) -> None:
+        expires = None if max_age is None else time.time() + max_age
+        self._sessions[key] = (expires, data)
+        while len(self._sessions) > self._maxsize:
+            self._sessions.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._sessions.pop(key, None)
+
+
+class SQLiteStorage(ServerSideStorage):
+    """Store sessions in an SQLite file, which can be shared by processes on one host.
+
+    Queries are run in a dedicated thread, so waiting on another process's write lock
+    doesn't block the event loop. The database uses WAL mode, so reads never wait on a
+    writer, and each query touches a single indexed row.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike[str]], *,
+                 cookie_name: str = "AIOHTTP_SESSION", max_age: Optional[int] = None,
+                 secure: bool = True, samesite: str = "Strict", session_ttl: int = 2592000):
+        super().__init__(cookie_name=cookie_name, max_age=max_age, secure=secure,
+                         samesite=samesite, session_ttl=session_ttl)
+        self._path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid = 0
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # Only used from the executor's single thread.
+            self._conn = sqlite3.connect(self._path, timeout=5, isolation_level=None,
+                                         check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS aiohttp_admin_session"
+                               " (key TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS aiohttp_admin_session_expires"
+                               " ON aiohttp_admin_session (expires)")
+        return self._conn
+
+    async def _run(self, func: Callable[..., _T], *args: object) -> _T:
+        # The connection and thread must not be shared with a forked worker.
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="aiohttp_admin_session")
+            self._conn = None
+            self._pid = os.getpid()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _load(self, key: str, now: float) -> Optional[str]:
+        row = self._db.execute(
+            "SELECT data FROM aiohttp_admin_session"
+            " WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, now)
+        ).fetchone()
+        return None if row is None else str(row[0])
+
+    def _save(self, key: str, data: str, now: float, expires: Optional[float]) -> None:
+        self._db.execute("DELETE FROM aiohttp_admin_session WHERE expires <= ?", (now,))
+        self._db.execute("INSERT INTO aiohttp_admin_session VALUES (?, ?, ?)",
+                         (key, data, expires))
+
+    def _delete(self, key: str) -> None:
+        self._db.execute("DELETE FROM aiohttp_admin_session WHERE key = ?", (key,))
+
+    async def load(self, key: str) -> Optional[str]:
+        return await self._run(self._load, key, time.time())
+
+    async def save(self, key: str, data: str, max_age: Optional[int]) -> None:
+        now = time.time()
+        expires = None if max_age is None else now + max_age
+        await self._run(self._save, key, data, now, expires)
+
+    async def delete(self, key: str) -> None:
+        await self._run(self._delete, key)
+
+    def close(self) -> None:
+        """Wait for pending queries, then close the database connection."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -1,10 +1,14 @@
-import re
 import sys
 from collections.abc import Callable, Collection, Sequence
-from typing import Any, Awaitable, Literal, Mapping, NewType, Optional
+from typing import Any, Awaitable, Literal, Mapping, NewType, Optional, TYPE_CHECKING
 
 from aiohttp.web import AppKey
 
+if TYPE_CHECKING:
+    from .codecs import AbstractJSONCodec
+    from .security import IdentityCache, LoginThrottle, PermissionParser
+    from .views import IndexPage
+
 if sys.version_info >= (3, 12):
     from typing import TypedDict
 else:
@@ -46,6 +50,8 @@ class InputState(ComponentState):
 
 class _IdentityDict(TypedDict, total=False):
     avatar: str
+    # Signed permission claims (see permission_claims_ttl).
+    claims: str
 
 
 class IdentityDict(_IdentityDict):
@@ -65,8 +71,42 @@ class UserDetails(TypedDict, total=False):
 class __SecuritySchema(TypedDict, total=False):
     # Callback that receives identity and should return user details for the admin to use.
     identity_callback: Callable[[str], Awaitable[UserDetails]]
+    # Seconds to cache identity_callback results between requests, defaults to 0.
+    # Concurrent lookups for the same identity are always combined into one call.
+    identity_ttl: float
+    # Maximum number of identities to keep in the cache, defaults to 1024.
+    identity_cache_size: int
     # max_age value for cookies/tokens, defaults to None.
     max_age: Optional[int]
+    # Format of the auth token sent to the client. Either "fernet" (encrypted, the
+    # default) or "signed" (a compact HMAC signed token, readable by the client).
+    token_format: Literal["fernet", "signed"]
+    # Previous values of the setup() secret which signed tokens will still be accepted
+    # for, allowing the secret to be rotated without logging out users.
+    previous_secrets: Sequence[bytes]
+    # Seconds for which permissions embedded in the client's token can be trusted,
+    # avoiding an identity_callback call on each request. Revoked permissions may
+    # continue to be used until the claims expire. Expired claims are re-issued to the
+    # client on its next request. Defaults to 0 (disabled).
+    permission_claims_ttl: int
+    # Number of recently verified (token, cookie) pairs to cache, which allows repeat
+    # requests to skip decrypting them. Defaults to 0 (disabled).
+    token_cache_size: int
+    # Seconds for which a verified token is cached. The session is not loaded for cached
+    # tokens, so with a server-side session storage, a logout in another worker (or an
+    # expired session) is only noticed after this delay. Defaults to 10.
+    token_cache_ttl: int
+    # Failed login attempts allowed for a username within login_attempts_window, further
+    # attempts are rejected with 429 Too Many Requests. Note that this allows anyone to
+    # lock out a known username. Defaults to 0 (disabled).
+    max_login_attempts: int
+    # Failed login attempts allowed from an IP address (request.remote) within
+    # login_attempts_window. Behind a reverse proxy, request.remote must be set to the
+    # client's address (e.g. with aiohttp-remotes), otherwise all users share one limit.
+    # Defaults to 0 (disabled).
+    max_login_attempts_per_ip: int
+    # Seconds over which failed login attempts are counted, defaults to 300.
+    login_attempts_window: int
     # Secure flag for cookies, defaults to True.
     secure: bool
 
@@ -113,9 +153,21 @@ class Resource(_Resource):
     model: Any  # TODO(pydantic): AbstractAdminResource
 
 
+class _CompressionSchema(TypedDict, total=False):
+    # Minimum response size in bytes to compress, defaults to 1024.
+    min_size: int
+    # gzip compression level from 1 (fastest) to 9 (smallest), defaults to 5.
+    level: int
+    # Responses larger than this many bytes are compressed in a thread pool, rather than
+    # blocking the event loop. Defaults to 65536.
+    executor_size: int
+
+
 class _Schema(TypedDict, total=False):
     view: _ViewSchema
     js_module: str
+    # Compression of API responses, None to disable.
+    compression: Optional[_CompressionSchema]
 
 
 class Schema(_Schema):
@@ -133,6 +185,8 @@ class _ResourceState(TypedDict):
     bulk_update: dict[str, dict[str, Any]]
     list_omit: tuple[str, ...]
     label: Optional[str]
+    # Fetch list totals separately from the rows (using the get_count URL).
+    deferred_count: bool
 
 
 class State(TypedDict):
@@ -142,6 +196,13 @@ class State(TypedDict):
     js_module: Optional[str]
 
 
+class StaticAssets(TypedDict):
+    # Filename of the admin JS bundle.
+    entry: str
+    # Content hashed files, which can be cached indefinitely.
+    hashed: frozenset[str]
+
+
 def comp(t: str, props: Optional[Mapping[str, object]] = None) -> ComponentState:
     """Use a component of type t with the given props."""
     props = dict(props or {})
@@ -171,6 +232,11 @@ def regex(value: str) -> RegexState:
 
 
 check_credentials_key = AppKey[Callable[[str, str], Awaitable[bool]]]("check_credentials")
-permission_re_key = AppKey("permission_re", re.Pattern[str])
+identity_cache_key: AppKey["IdentityCache"] = AppKey("identity_cache")
+index_key: AppKey["IndexPage"] = AppKey("index")
+json_codec_key: AppKey["AbstractJSONCodec"] = AppKey("json_codec")
+login_throttle_key: AppKey["LoginThrottle"] = AppKey("login_throttle")
+permission_re_key: AppKey["PermissionParser"] = AppKey("permission_re")
 resources_key = AppKey("resources", dict[str, Any])  # TODO(pydantic): AbstractAdminResource
 state_key = AppKey("state", State)
+static_assets_key = AppKey("static_assets", StaticAssets)
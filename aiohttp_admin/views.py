@@ -1,13 +1,22 @@
 import __main__
+import gzip
+import hashlib
 import json
 import sys
+from typing import Optional
 
 from aiohttp import web
+from aiohttp.helpers import ETAG_ANY
 from aiohttp_security import forget, remember
-from pydantic import Json
 
 from .security import check
-from .types import check_credentials_key, state_key
+from .types import (check_credentials_key, index_key, json_codec_key, login_throttle_key,
+                    state_key, static_assets_key)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
 
 if sys.version_info >= (3, 12):
     from typing import TypedDict
@@ -35,31 +44,117 @@ INDEX_TEMPLATE = """<!doctype html>
 </html>"""
 
 
-async def index(request: web.Request) -> web.Response:
-    """Root page which loads react-admin."""
-    static = request.app.router["static"]
-    js = static.url_for(filename="admin.js")
-    state = json.dumps(request.app[state_key])
+def _render_index(app: web.Application, state: str) -> str:
+    static = app.router["static"]
+    js = static.url_for(filename=app[static_assets_key]["entry"])
 
     # __package__ can be None, despite what the documentation claims.
     package_name = __main__.__package__ or "My"
     # Common convention is to have _app suffix for package name, so try and strip that.
     package_name = package_name.removesuffix("_app").replace("_", " ").title()
-    name = request.app[state_key]["view"].get("name", package_name)
+    name = app[state_key]["view"].get("name", package_name)
+
+    icon = app[state_key]["view"].get("icon", static.url_for(filename="favicon.svg"))
+
+    return INDEX_TEMPLATE.format(name=name, icon=icon, js=js, state=state)
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    """Return the content codings accepted by an Accept-Encoding header."""
+    encodings = set()
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        q = params.partition("q=")[2]
+        try:
+            if q and float(q) <= 0:
+                continue
+        except ValueError:
+            continue
+        encodings.add(coding.strip().lower())
+    return encodings
+
+
+class IndexPage:
+    """The index page, rendered once with compressed variants.
+
+    The page is rendered on startup, and rendered again if the admin state has changed
+    since (checked by comparing the encoded state, which is much cheaper than rendering).
+    """
+
+    def __init__(self) -> None:
+        # Content-Encoding -> (body, etag)
+        self._variants: dict[str, tuple[bytes, str]] = {}
+        # The encoded state the page was rendered from.
+        self._state: Optional[str] = None
+
+    def render(self, app: web.Application, state: Optional[str] = None) -> None:
+        """Render the page from the admin app's current state."""
+        if state is None:
+            state = json.dumps(app[state_key])
+        html = _render_index(app, state).encode()
+        etag = hashlib.sha256(html).hexdigest()[:32]
+        # Strong ETags must differ for each encoding of the page.
+        variants = {"identity": (html, etag),
+                    "gzip": (gzip.compress(html, mtime=0), etag + "-gzip")}
+        if brotli is not None:
+            variants["br"] = (brotli.compress(html), etag + "-br")
+        self._variants = variants
+        self._state = state
+
+    def response(self, request: web.Request) -> web.Response:
+        state = json.dumps(request.app[state_key])
+        if state != self._state:
+            self.render(request.app, state)
+
+        accepted = _accepted_encodings(request.headers.get("Accept-Encoding", ""))
+        encoding = next((e for e in ("br", "gzip") if e in accepted and e in self._variants),
+                        "identity")
+        body, etag = self._variants[encoding]
+
+        headers = {"ETag": f'"{etag}"', "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+        if request.if_none_match and any(e.value in (etag, ETAG_ANY)
+                                         for e in request.if_none_match):
+            return web.Response(status=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return web.Response(body=body, headers=headers, content_type="text/html",
+                            charset="utf-8")
+
+
+async def static_cache_headers(request: web.Request, response: web.StreamResponse) -> None:
+    """Allow content hashed static files to be cached indefinitely."""
+    resource = request.match_info.route.resource
+    if resource is not None and resource.name == "static":
+        if request.match_info.get("filename") in request.app[static_assets_key]["hashed"]:
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
 
-    icon = request.app[state_key]["view"].get("icon", static.url_for(filename="favicon.svg"))
 
-    output = INDEX_TEMPLATE.format(name=name, icon=icon, js=js, state=state)
-    return web.Response(text=output, content_type="text/html")
+async def index(request: web.Request) -> web.Response:
+    """Root page which loads react-admin."""
+    return request.app[index_key].response(request)
 
 
 async def token(request: web.Request) -> web.Response:
     """Validate user credentials and log the user in."""
-    data = check(Json[_Login], await request.read())
+    try:
+        body = request.app[json_codec_key].loads(await request.read())
+    except ValueError:
+        raise web.HTTPBadRequest(text="Invalid JSON")
+    data = check(_Login, body)
+
+    # Reject throttled clients before doing any expensive password hashing. The attempt
+    # is recorded before awaiting, so concurrent requests can't bypass the limit.
+    throttle = request.app[login_throttle_key]
+    retry_after = throttle.attempt(data["username"], request.remote)
+    if retry_after:
+        raise web.HTTPTooManyRequests(text="Too many login attempts",
+                                      headers={"Retry-After": str(retry_after)})
 
     check_credentials = request.app[check_credentials_key]
     if not await check_credentials(data["username"], data["password"]):
         raise web.HTTPUnauthorized(text="Wrong username or password")
+    throttle.succeeded(data["username"], request.remote)
 
     response = web.Response()
     await remember(request, response, data["username"])
@@ -0,0 +1,63 @@
+"""Benchmark TokenIdentityPolicy.identify() throughput.
+
+Compares verifying the token and session cookie on every request against the cache of
+recently verified tokens (security "token_cache_size" option).
+
+Run with: python benchmarks/identify.py
+"""
+
+import asyncio
+import json
+import time
+
+import aiohttp_session
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+from aiohttp_session.cookie_storage import EncryptedCookieStorage
+
+from aiohttp_admin.security import FernetToken, IdentityCache, TokenIdentityPolicy
+from aiohttp_admin.types import Schema
+
+NUMBER = 5000
+
+
+async def check_credentials(username: str, password: str) -> bool:
+    return True
+
+
+async def run(token_cache_size: int) -> float:
+    schema: Schema = {"security": {"check_credentials": check_credentials,
+                                   "max_age": 3600, "token_cache_size": token_cache_size},
+                      "resources": ()}
+    storage = EncryptedCookieStorage(b"x" * 32, max_age=3600)
+    token = FernetToken(storage._fernet)
+    policy = TokenIdentityPolicy(token, schema, IdentityCache(), storage.cookie_name)
+
+    session = {"session": {"AIOHTTP_SECURITY": "admin"}, "created": int(time.time())}
+    cookie = storage._fernet.encrypt(json.dumps(session).encode()).decode()
+    auth = token.dumps("admin")
+    headers = {"Authorization": json.dumps({"auth": auth, "fullName": "Admin",
+                                            "permissions": {}}),
+               "Cookie": f"{storage.cookie_name}={cookie}"}
+
+    app = web.Application()
+    requests = []
+    for _ in range(NUMBER):
+        request = make_mocked_request("GET", "/admin/dummy/list", headers=headers, app=app)
+        request[aiohttp_session.STORAGE_KEY] = storage
+        requests.append(request)
+
+    start = time.perf_counter()
+    for request in requests:
+        assert await policy.identify(request) == "admin"  # noqa: S101
+    return time.perf_counter() - start
+
+
+async def main() -> None:
+    for name, size in (("no cache", 0), ("token cache", 1024)):
+        t = await run(size)
+        print(f"{name:<12} {NUMBER / t:10.0f} identify() calls/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
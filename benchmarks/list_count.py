@@ -0,0 +1,118 @@
+"""Benchmark pool utilisation of SAResource.get_list() under concurrent list requests.
+
+Compares the default separate COUNT(*) query (run concurrently on a second connection)
+against count_strategy="inline", which fetches the total with the rows in one query.
+The pool is deliberately small, so pool timeouts show up under load.
+
+Run with: python benchmarks/list_count.py
+"""
+
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from aiohttp_admin.backends.abc import GetListParams
+from aiohttp_admin.backends.sqlalchemy import CountStrategy, SAResource
+
+ROWS = 20000
+CONCURRENCY = 50
+REQUESTS = 1000
+POOL_SIZE = 5
+
+
+class Base(DeclarativeBase):
+    """Base model."""
+
+
+class Item(Base):
+    __tablename__ = "item"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str]
+    value: Mapped[int]
+
+
+class PoolStats:
+    """Track checked out connections using pool events."""
+
+    def __init__(self, engine: AsyncEngine):
+        self.checkouts = 0
+        self.current = 0
+        self.peak = 0
+        # Total time connections were checked out for.
+        self.held = 0.
+        self._last = time.perf_counter()
+        sa.event.listen(engine.sync_engine, "checkout", self.checkout)
+        sa.event.listen(engine.sync_engine, "checkin", self.checkin)
+
+    def _update(self, change: int) -> None:
+        now = time.perf_counter()
+        self.held += self.current * (now - self._last)
+        self._last = now
+        self.current += change
+
+    def checkout(self, *args: object) -> None:
+        self._update(1)
+        self.checkouts += 1
+        self.peak = max(self.peak, self.current)
+
+    def checkin(self, *args: object) -> None:
+        self._update(-1)
+
+
+async def run(url: str, strategy: CountStrategy, sort: str) -> None:
+    engine = create_async_engine(url, pool_size=POOL_SIZE, max_overflow=0, pool_timeout=2)
+    stats = PoolStats(engine)
+    resource = SAResource(engine, Item, count_strategy=strategy)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies: list[float] = []
+    timeouts = 0
+
+    async def request(i: int) -> None:
+        nonlocal timeouts
+        params: GetListParams = {
+            "pagination": {"page": i % 50 + 1, "perPage": 25},
+            "sort": {"field": sort, "order": "ASC"}, "filter": {}}
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await resource.get_list(params)
+            except sa.exc.TimeoutError:
+                timeouts += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(REQUESTS)))
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    print(f"{sort:<6} {strategy:<7} {REQUESTS / elapsed:6.0f} requests/s  "
+          f"p95 {p95:7.1f} ms  checkouts/request {stats.checkouts / REQUESTS:4.2f}  "
+          f"connection ms/request {stats.held / REQUESTS * 1000:6.2f}  "
+          f"peak {stats.peak}/{POOL_SIZE}  pool timeouts {timeouts}")
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}"
+        engine = create_async_engine(url)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(sa.insert(Item), [{"name": f"item {i}", "value": i % 997}
+                                                 for i in range(ROWS)])
+        await engine.dispose()
+
+        # Sorting by the primary key can use the index, sorting by value can't.
+        for sort in ("id", "value"):
+            for strategy in ("exact", "inline"):
+                await run(url, strategy, sort)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+"""Benchmark encoding a 1000 row get_list response as MessagePack, compared to JSON.
+
+Run with: python benchmarks/msgpack_codec.py
+"""
+
+import timeit
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from functools import partial
+from uuid import uuid4
+
+from aiohttp_admin.codecs import StdlibJSONCodec
+from aiohttp_admin.codecs.msgpack import MsgpackCodec
+from aiohttp_admin.codecs.orjson import OrjsonCodec
+
+
+class Status(Enum):
+    active = "active"
+    inactive = "inactive"
+
+
+def record(i: int) -> dict[str, object]:
+    return {"id": i, "name": f"Item {i}", "status": Status.active, "price": Decimal("9.99"),
+            "created": datetime(2023, 1, 2, 3, 4, 5), "due": date(2023, 5, 6),
+            "uuid": uuid4(), "count": i * 3, "ratio": i / 7, "notes": None,
+            "enabled": i % 2 == 0}
+
+
+PAYLOAD = {"data": [{"id": str(i), "data": record(i), "fk_owner_id": str(i % 7)}
+                    for i in range(1000)], "total": 1000}
+NUMBER = 20
+
+
+def main() -> None:
+    codecs = (StdlibJSONCodec(), OrjsonCodec(), MsgpackCodec())
+    for codec in codecs:
+        size = len(codec.dumps(PAYLOAD))
+        t = min(timeit.repeat(partial(codec.dumps, PAYLOAD), number=NUMBER, repeat=5))
+        print(f"{type(codec).__name__:<18} {t / NUMBER * 1e3:8.2f} ms per response"
+              f" {size / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
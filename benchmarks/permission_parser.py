@@ -0,0 +1,64 @@
+"""Benchmark permission validation for a large synthetic schema.
+
+Compares the alternation regex previously built by setup(), containing every resource
+and field name, against PermissionParser.
+
+Run with: python benchmarks/permission_parser.py
+"""
+
+import re
+import timeit
+from collections.abc import Callable
+from functools import partial
+
+from aiohttp_admin.security import PermissionParser
+
+# ~400 tables and ~6000 columns.
+FIELDS = {f"table{i}": tuple(f"column{j}" for j in range(15)) for i in range(400)}
+PERMISSIONS = (
+    "admin.view", "~admin.table0.*", "admin.table399.column14.edit",
+    'admin.table200.*|column3=5|column7="active"', "admin.table399.missing.view",
+    "admin.unknown.view",
+)
+NUMBER = 1000
+
+
+def build_regex() -> re.Pattern[str]:
+    resource_patterns = []
+    for r, fields in FIELDS.items():
+        resource_patterns.append(
+            r"(?#Resource name){r}"
+            r"(?#Optional field name)(\.({f}))?"
+            r"(?#Permission type)\.(view|edit|add|delete|\*)"
+            r"(?#No filters if negated)(?(2)$|"
+            r'(?#Optional filters)\|({f})=(?#JSON number or str)(\".*?\"|\d+))*'.format(
+                r=r, f="|".join(fields)))
+    p_re = (r"(?#Global admin permission)~?admin\.(view|edit|add|delete|\*)"
+            r"|"
+            r"(?#Resource permission)(~)?admin\.({})").format("|".join(resource_patterns))
+    re.purge()
+    return re.compile(p_re)
+
+
+def match_all(f: Callable[[str], object]) -> None:
+    for p in PERMISSIONS:
+        f(p)
+
+
+def main() -> None:
+    t = min(timeit.repeat(build_regex, number=1, repeat=3))
+    print(f"{'regex startup':<22} {t * 1e3:10.2f} ms")
+    t = min(timeit.repeat(lambda: PermissionParser(FIELDS), number=10, repeat=3)) / 10
+    print(f"{'parser startup':<22} {t * 1e3:10.2f} ms")
+
+    regex = build_regex()
+    parser = PermissionParser(FIELDS)
+    assert all((regex.fullmatch(p) is None) == (parser.parse(p) is None)
+               for p in PERMISSIONS)
+    for name, f in (("regex match", regex.fullmatch), ("parser match", parser.parse)):
+        t = min(timeit.repeat(partial(match_all, f), number=NUMBER, repeat=3))
+        print(f"{name:<22} {t / (NUMBER * len(PERMISSIONS)) * 1e6:10.2f} µs per permission")
+
+
+if __name__ == "__main__":
+    main()
@@ -43,5 +43,7 @@ setup(name="aiohttp-admin",
       install_requires=("aiohttp>=3.9", "aiohttp_security", "aiohttp_session",
                         "cryptography", "pydantic>2,<3",
                         'typing_extensions>=3.10; python_version<"3.12"'),
-      extras_require={"sa": ["sqlalchemy>=2.0.4,<3"]},
+      extras_require={"brotli": ["brotli"], "msgpack": ["msgpack>=1"],
+                      "orjson": ['orjson>=3; platform_python_implementation == "CPython"'],
+                      "sa": ["sqlalchemy>=2.0.4,<3"]},
       include_package_data=True)
@@ -1,11 +1,12 @@
 from collections.abc import Awaitable, Callable
-from typing import Optional
+from typing import Any, Optional
 from unittest.mock import AsyncMock, create_autospec
 
 import pytest
 import sqlalchemy as sa
 from aiohttp import web
 from aiohttp.test_utils import TestClient
+from aiohttp_session import AbstractStorage
 from pytest_aiohttp import AiohttpClient
 from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
                                     async_sessionmaker, create_async_engine)
@@ -14,6 +15,7 @@ from sqlalchemy.orm import DeclarativeBaseNoMeta, Mapped, mapped_column, relatio
 import aiohttp_admin
 from _auth import check_credentials
 from aiohttp_admin.backends.sqlalchemy import SAResource
+from aiohttp_admin.codecs import AbstractJSONCodec
 
 IdentityCallback = Callable[[Optional[str]], Awaitable[aiohttp_admin.UserDetails]]
 _Client = TestClient[web.Request, web.Application]
@@ -60,7 +62,11 @@ def mock_engine() -> AsyncMock:
 def create_admin_client(
     aiohttp_client: AiohttpClient
 ) -> Callable[[Optional[IdentityCallback]], Awaitable[_Client]]:
-    async def admin_client(identity_callback: Optional[IdentityCallback] = None) -> _Client:
+    async def admin_client(identity_callback: Optional[IdentityCallback] = None, *,
+                           session_storage: Optional[AbstractStorage] = None,
+                           json_codec: Optional[AbstractJSONCodec] = None,
+                           extra_schema: Optional[dict[str, Any]] = None,
+                           **security: Any) -> _Client:
         app = web.Application()
         app[model] = DummyModel
         app[model2] = Dummy2Model
@@ -90,7 +96,10 @@ def create_admin_client(
         }
         if identity_callback:
             schema["security"]["identity_callback"] = identity_callback
-        app[admin] = aiohttp_admin.setup(app, schema)
+        schema["security"].update(security)  # type: ignore[typeddict-item]
+        schema.update(extra_schema or {})  # type: ignore[typeddict-item]
+        app[admin] = aiohttp_admin.setup(app, schema, session_storage=session_storage,
+                                         json_codec=json_codec)
 
         return await aiohttp_client(app)
 
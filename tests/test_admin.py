@@ -4,6 +4,7 @@ from aiohttp import web
 import aiohttp_admin
 from _auth import check_credentials
 from _resources import DummyResource
+from aiohttp_admin.security import ParsedPermission
 from aiohttp_admin.types import comp, func, permission_re_key, state_key
 
 
@@ -88,6 +89,10 @@ def test_re() -> None:
     assert r.fullmatch("~admin.testre.edit|id=5") is None
     assert r.fullmatch('~admin.testre.value.delete|value="1"') is None
 
+    assert r.parse('admin.testre.value.add|id=1|value="a|value=""') == ParsedPermission(
+        False, "testre", "value", "add", (("id", "1"), ("value", '"a|value=""')))
+    assert r.parse("~admin.testre.*") == ParsedPermission(True, "testre", None, "*", ())
+
 
 def test_display() -> None:
     app = web.Application()
@@ -28,3 +28,34 @@ async def test_invalid_field(admin_client: _Client, login: _Login) -> None:
     async with admin_client.post(url, params=p, headers=h) as resp:
         assert resp.status == 400, await resp.text()
         assert "Invalid field 'incorrect'" in await resp.text()
+
+
+async def test_invalid_filter(admin_client: _Client, login: _Login) -> None:
+    h = await login(admin_client)
+    assert admin_client.app
+    url = admin_client.app[admin].router["dummy2_get_list"].url_for()
+    p = {"pagination": json.dumps({"page": 1, "perPage": 10}),
+         "sort": json.dumps({"field": "id", "order": "ASC"}),
+         "filter": json.dumps({"data": {"id": "foo"}})}
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 400, await resp.text()
+        errors = await resp.json()
+        assert [(e["loc"], e["type"]) for e in errors] == [
+            (["filter", "id"], "int_parsing")]
+
+    p["filter"] = json.dumps({"incorrect": 1})
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 400, await resp.text()
+        errors = await resp.json()
+        assert [(e["loc"], e["type"]) for e in errors] == [
+            (["filter", "incorrect"], "extra_forbidden")]
+
+
+async def test_invalid_id(admin_client: _Client, login: _Login) -> None:
+    h = await login(admin_client)
+    assert admin_client.app
+    url = admin_client.app[admin].router["dummy2_get_many"].url_for()
+    async with admin_client.get(url, params={"ids": '["1", "foo"]'}, headers=h) as resp:
+        assert resp.status == 400, await resp.text()
+        errors = await resp.json()
+        assert [(e["loc"], e["type"]) for e in errors] == [(["ids", 1, 0], "int_parsing")]
@@ -2,6 +2,7 @@ import json
 from collections.abc import Awaitable, Callable
 from datetime import date, datetime
 from typing import Optional, Union
+from unittest import mock
 
 import pytest
 import sqlalchemy as sa
@@ -14,8 +15,9 @@ from sqlalchemy.types import TypeDecorator
 
 import aiohttp_admin
 from _auth import check_credentials
+from aiohttp_admin.backends.abc import ApproximateTotal, Cursor, GetListParams, PartialTotal
 from aiohttp_admin.backends.sqlalchemy import FIELD_TYPES, SAResource, permission_for
-from aiohttp_admin.types import comp, data, fk, func, regex
+from aiohttp_admin.types import comp, data, fk, func, regex, state_key
 from conftest import admin
 
 _Client = TestClient[web.Request, web.Application]
@@ -489,6 +491,47 @@ async def test_datetime(
             "id": 2, "date": "2024-05-09", "time": "2020-11-12 03:04:05"}}}
 
 
+async def test_list_columns_keys(
+    base: DeclarativeBase, aiohttp_client: Callable[[web.Application], Awaitable[_Client]],
+    login: _Login
+) -> None:
+    class TestModel(base):  # type: ignore[misc,valid-type]
+        __tablename__ = "test"
+        time: Mapped[datetime] = mapped_column(primary_key=True)
+        active: Mapped[bool] = mapped_column(primary_key=True)
+
+    app = web.Application()
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    db = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(base.metadata.create_all)
+    async with db.begin() as sess:
+        sess.add(TestModel(time=datetime(2023, 1, 2, 3, 4), active=True))
+
+    schema: aiohttp_admin.Schema = {
+        "security": {
+            "check_credentials": check_credentials,
+            "secure": False
+        },
+        "resources": ({"model": SAResource(engine, TestModel)},)
+    }
+    app[admin] = aiohttp_admin.setup(app, schema)
+
+    admin_client = await aiohttp_client(app)
+    assert admin_client.app
+    h = await login(admin_client)
+
+    # JS can't rebuild the IDs from these keys, so records are returned instead of rows.
+    url = app[admin].router["test_get_list"].url_for()
+    p = {"pagination": '{"page": 1, "perPage": 10}', "sort": '{"field": "time", "order": "ASC"}',
+         "filter": "{}", "format": "columns"}
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        assert await resp.json() == {"data": [{
+            "id": "2023-01-02 03:04:00|True",
+            "data": {"time": "2023-01-02 03:04:00", "active": True}}], "total": 1}
+
+
 def test_permission_for(base: type[DeclarativeBase]) -> None:
     class M(base):  # type: ignore[misc,valid-type]
         __tablename__ = "test"
@@ -576,3 +619,259 @@ async def test_record_type(
         errors = await resp.json()
         assert any(e["loc"] == ["foo"] and e["type"] == "bool_parsing" for e in errors)
         assert any(e["loc"] == ["bar"] and e["type"] == "int_type" for e in errors)
+
+
+async def test_version_field(
+    base: DeclarativeBase, aiohttp_client: Callable[[web.Application], Awaitable[_Client]],
+    login: _Login
+) -> None:
+    class TestModel(base):  # type: ignore[misc,valid-type]
+        __tablename__ = "test"
+        id: Mapped[int] = mapped_column(primary_key=True)
+        version: Mapped[int] = mapped_column(default=1)
+        text: Mapped[str]
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(base.metadata.create_all)
+        await conn.execute(sa.insert(TestModel.__table__).values(id=1, text="foo"))
+
+    with pytest.raises(ValueError, match="version_field"):
+        SAResource(engine, TestModel, version_field="missing")
+
+    app = web.Application()
+    schema: aiohttp_admin.Schema = {
+        "security": {
+            "check_credentials": check_credentials,
+            "secure": False
+        },
+        "resources": ({"model": SAResource(engine, TestModel, version_field="version")},)
+    }
+    app[admin] = aiohttp_admin.setup(app, schema)
+
+    admin_client = await aiohttp_client(app)
+    h = await login(admin_client)
+
+    url = app[admin].router["test_get_one"].url_for()
+    async with admin_client.get(url, params={"id": 1}, headers=h) as resp:
+        assert resp.status == 200
+        etag = resp.headers["ETag"]
+
+    with mock.patch.object(SAResource, "_convert_record") as convert:
+        async with admin_client.get(url, params={"id": 1},
+                                    headers={**h, "If-None-Match": etag}) as resp:
+            assert resp.status == 304
+        convert.assert_not_called()
+
+    # Changes which don't touch the version field are not detected.
+    async with engine.begin() as conn:
+        await conn.execute(sa.update(TestModel.__table__).values(text="bar"))
+    async with admin_client.get(url, params={"id": 1},
+                                headers={**h, "If-None-Match": etag}) as resp:
+        assert resp.status == 304
+
+    async with engine.begin() as conn:
+        await conn.execute(sa.update(TestModel.__table__).values(version=2))
+    async with admin_client.get(url, params={"id": 1},
+                                headers={**h, "If-None-Match": etag}) as resp:
+        assert resp.status == 200
+        assert resp.headers["ETag"] != etag
+        assert (await resp.json())["data"]["data"]["text"] == "bar"
+
+
+async def test_count_strategy(
+    base: DeclarativeBase, aiohttp_client: Callable[[web.Application], Awaitable[_Client]],
+    login: _Login
+) -> None:
+    class TestModel(base):  # type: ignore[misc,valid-type]
+        __tablename__ = "test"
+        id: Mapped[int] = mapped_column(primary_key=True)
+        text: Mapped[str]
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(base.metadata.create_all)
+        await conn.execute(sa.insert(TestModel.__table__),
+                           [{"id": i, "text": "foo"} for i in range(1, 4)])
+    params: GetListParams = {"pagination": {"page": 1, "perPage": 2}, "filter": {},
+                             "sort": {"field": "id", "order": "ASC"}}
+
+    r = SAResource(engine, TestModel, count_strategy="cached")
+    records, total = await r.get_list(params)
+    assert len(records) == 2
+    assert total == 3
+    assert not isinstance(total, ApproximateTotal)
+    async with engine.begin() as conn:
+        await conn.execute(sa.insert(TestModel.__table__).values(id=4, text="bar"))
+    records, total = await r.get_list(params)
+    assert total == 3
+    assert isinstance(total, ApproximateTotal)
+    records, total = await r.get_list({**params, "filter": {"text": "bar"}})
+    assert total == 1
+    assert not isinstance(total, ApproximateTotal)
+    r = SAResource(engine, TestModel, count_strategy="cached", count_ttl=0)
+    records, total = await r.get_list(params)
+    assert total == 4
+
+    r = SAResource(engine, TestModel, count_strategy="estimate")
+    with mock.patch.object(SAResource, "estimate_threshold", 2):
+        # No statistics available until ANALYZE is run.
+        records, total = await r.get_list(params)
+        assert total == 4
+        assert not isinstance(total, ApproximateTotal)
+        async with engine.begin() as conn:
+            await conn.execute(sa.text("ANALYZE"))
+            await conn.execute(sa.insert(TestModel.__table__).values(id=5, text="bar"))
+        records, total = await r.get_list(params)
+        assert total == 4
+        assert isinstance(total, ApproximateTotal)
+        # Filtered queries are counted exactly.
+        records, total = await r.get_list({**params, "filter": {"text": "bar"}})
+        assert total == 2
+    records, total = await r.get_list(params)
+    assert total == 5
+
+    r = SAResource(engine, TestModel, count_strategy="has_next")
+    records, total = await r.get_list(params)
+    assert [rec["id"] for rec in records] == [1, 2]
+    assert isinstance(total, PartialTotal)
+    assert r._total_data(total, params["pagination"], len(records)) == {
+        "pageInfo": {"hasNextPage": True, "hasPreviousPage": False}}
+    assert r._total_data(ApproximateTotal(4), params["pagination"], 2) == {
+        "total": 4, "approximate": True}
+
+    app = web.Application()
+    schema: aiohttp_admin.Schema = {
+        "security": {
+            "check_credentials": check_credentials,
+            "secure": False
+        },
+        "resources": ({"model": r},)
+    }
+    app[admin] = aiohttp_admin.setup(app, schema)
+    admin_client = await aiohttp_client(app)
+    h = await login(admin_client)
+
+    url = app[admin].router["test_get_list"].url_for()
+    p = {"pagination": json.dumps({"page": 3, "perPage": 2}),
+         "sort": json.dumps({"field": "id", "order": "ASC"}), "filter": "{}"}
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        assert await resp.json() == {
+            "data": [{"id": "5", "data": {"id": 5, "text": "bar"}}],
+            "pageInfo": {"hasNextPage": False, "hasPreviousPage": True}}
+
+    # Streamed responses fall back to get_list().
+    with mock.patch.object(SAResource, "stream_threshold", 1):
+        async with admin_client.get(url, params=p, headers=h) as resp:
+            assert resp.status == 200
+            assert resp.headers["Transfer-Encoding"] == "chunked"
+            assert (await resp.json())["pageInfo"] == {"hasNextPage": False,
+                                                       "hasPreviousPage": True}
+
+
+async def test_inline_count(base: DeclarativeBase) -> None:
+    class TestModel(base):  # type: ignore[misc,valid-type]
+        __tablename__ = "test"
+        id: Mapped[int] = mapped_column(primary_key=True)
+        count: Mapped[int]
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(base.metadata.create_all)
+        await conn.execute(sa.insert(TestModel.__table__),
+                           [{"id": i, "count": i * 2} for i in range(1, 6)])
+    params: GetListParams = {"pagination": {"page": 2, "perPage": 2}, "filter": {},
+                             "sort": {"field": "id", "order": "ASC"}}
+
+    r = SAResource(engine, TestModel, count_strategy="inline")
+    with mock.patch.object(AsyncEngine, "connect", autospec=True,
+                           side_effect=AsyncEngine.connect) as connect:
+        records, total = await r.get_list(params)
+        assert records == [{"id": 3, "count": 6}, {"id": 4, "count": 8}]
+        assert total == 5
+        connect.assert_called_once()
+
+        # The total is counted separately for an empty page.
+        records, total = await r.get_list({**params, "pagination": {"page": 4, "perPage": 2}})
+        assert records == []
+        assert total == 5
+        assert connect.call_count == 2
+
+    records, total = await r.get_list({**params, "cursor": Cursor(3, (3,))})
+    assert records == [{"id": 4, "count": 8}, {"id": 5, "count": 10}]
+    assert total == 5
+    records, total = await r.get_list({**params, "filter": {"id": 2}})
+    assert total == 1
+
+    # The admin client must not fetch the count separately.
+    app = web.Application()
+    schema: aiohttp_admin.Schema = {
+        "security": {
+            "check_credentials": check_credentials,
+            "secure": False
+        },
+        "resources": ({"model": r},)
+    }
+    app[admin] = aiohttp_admin.setup(app, schema)
+    assert app[admin][state_key]["resources"]["test"]["deferred_count"] is False
+
+
+async def test_list_fields(
+    base: DeclarativeBase, aiohttp_client: Callable[[web.Application], Awaitable[_Client]],
+    login: _Login
+) -> None:
+    class Author(base):  # type: ignore[misc,valid-type]
+        __tablename__ = "author"
+        id: Mapped[int] = mapped_column(primary_key=True)
+
+    class TestModel(base):  # type: ignore[misc,valid-type]
+        __tablename__ = "test"
+        id: Mapped[int] = mapped_column(primary_key=True)
+        title: Mapped[str]
+        notes: Mapped[str] = mapped_column(sa.Text)
+        rank: Mapped[int]
+        author_id: Mapped[int] = mapped_column(sa.ForeignKey(Author.id))
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(base.metadata.create_all)
+        await conn.execute(sa.insert(Author.__table__).values(id=1))
+        await conn.execute(sa.insert(TestModel.__table__).values(
+            id=1, title="foo", notes="long text", rank=3, author_id=1))
+
+    app = web.Application()
+    schema: aiohttp_admin.Schema = {
+        "security": {
+            "check_credentials": check_credentials,
+            "secure": False
+        },
+        "resources": ({"model": SAResource(engine, TestModel)},
+                      {"model": SAResource(engine, Author)})
+    }
+    app[admin] = aiohttp_admin.setup(app, schema)
+    admin_client = await aiohttp_client(app)
+    h = await login(admin_client)
+
+    url = app[admin].router["test_get_list"].url_for()
+    p = {"pagination": json.dumps({"page": 1, "perPage": 10}),
+         "sort": json.dumps({"field": "data.rank", "order": "ASC"}), "filter": "{}",
+         "fields": '["data.title", "fk_author_id", "id"]'}
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        # Keys, and the sort field, are included as well as the displayed fields.
+        assert await resp.json() == {"data": [{
+            "id": "1", "fk_author_id": "1",
+            "data": {"id": 1, "title": "foo", "rank": 3, "author_id": 1}}], "total": 1}
+
+    p["fields"] = "[]"
+    p["filter"] = json.dumps({"notes": "long"})
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        assert (await resp.json())["data"][0]["data"] == {"id": 1, "rank": 3, "author_id": 1}
+
+    # Hidden fields are loaded by get_one() for the show/edit views.
+    url = app[admin].router["test_get_one"].url_for()
+    async with admin_client.get(url, params={"id": 1}, headers=h) as resp:
+        assert resp.status == 200
+        assert (await resp.json())["data"]["data"]["notes"] == "long text"
@@ -0,0 +1,125 @@
+import json
+from collections.abc import Awaitable, Callable
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from uuid import UUID
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient
+
+from aiohttp_admin.codecs import AbstractJSONCodec, StdlibJSONCodec
+from conftest import admin
+
+_Client = TestClient[web.Request, web.Application]
+_Login = Callable[[_Client], Awaitable[dict[str, str]]]
+
+
+class Colour(Enum):
+    red = "RED"
+
+
+RECORD = {"date": date(2023, 4, 23), "time": time(3, 4), "enum": Colour.red,
+          "bytes": b"abc", "decimal": Decimal("1.5"), "uuid": UUID(int=1), "list": (1, None)}
+EXPECTED = {"date": "2023-04-23", "time": "03:04:00", "enum": "RED", "bytes": "abc",
+            "decimal": 1.5, "uuid": "00000000-0000-0000-0000-000000000001", "list": [1, None]}
+
+
+def _orjson_codec() -> AbstractJSONCodec:
+    # Optional dependency, which is not available on PyPy.
+    pytest.importorskip("orjson")
+    from aiohttp_admin.codecs.orjson import OrjsonCodec
+    return OrjsonCodec()
+
+
+@pytest.mark.parametrize("name", ("stdlib", "orjson"))
+def test_codec(name: str) -> None:
+    codec = StdlibJSONCodec() if name == "stdlib" else _orjson_codec()
+    assert json.loads(codec.dumps(RECORD)) == EXPECTED
+    assert codec.loads(b'{"a": [1, "b"]}') == {"a": [1, "b"]}
+    with pytest.raises(ValueError):
+        codec.loads("{")
+
+
+def test_msgpack_codec() -> None:
+    msgpack = pytest.importorskip("msgpack")
+    from aiohttp_admin.codecs.msgpack import MsgpackCodec
+    d = {**RECORD, "dt": datetime(2023, 1, 2, 3, 4)}
+    expected = {**EXPECTED, "bytes": b"abc", "dt": "2023-01-02 03:04:00"}
+    assert msgpack.unpackb(MsgpackCodec().dumps(d)) == expected
+
+
+@pytest.mark.parametrize("name,expected", (("stdlib", "2023-01-02 03:04:00"),
+                                           ("orjson", "2023-01-02T03:04:00")))
+def test_datetime_format(name: str, expected: str) -> None:
+    codec = StdlibJSONCodec() if name == "stdlib" else _orjson_codec()
+    assert json.loads(codec.dumps({"dt": datetime(2023, 1, 2, 3, 4)})) == {"dt": expected}
+
+
+async def test_setup_codec(create_admin_client: Callable[..., Awaitable[_Client]],
+                           login: _Login) -> None:
+    admin_client = await create_admin_client(json_codec=_orjson_codec())
+
+    assert admin_client.app
+    h = await login(admin_client)
+    url = admin_client.app[admin].router["dummy2_get_list"].url_for()
+    p = {"pagination": json.dumps({"page": 1, "perPage": 10}),
+         "sort": json.dumps({"field": "id", "order": "DESC"}), "filter": "{}"}
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        assert resp.content_type == "application/json"
+        assert await resp.json() == {"data": [
+            {"id": "3", "data": {"id": 3, "msg": "Other"}},
+            {"id": "2", "data": {"id": 2, "msg": "Test"}},
+            {"id": "1", "data": {"id": 1, "msg": "Test"}}], "total": 3}
+
+
+async def test_msgpack_response(admin_client: _Client, login: _Login) -> None:
+    msgpack = pytest.importorskip("msgpack")
+    assert admin_client.app
+    h = await login(admin_client)
+    url = admin_client.app[admin].router["dummy2_get_list"].url_for()
+    p = {"pagination": json.dumps({"page": 1, "perPage": 1000}),
+         "sort": json.dumps({"field": "id", "order": "DESC"}), "filter": "{}"}
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        assert resp.headers["Transfer-Encoding"] == "chunked"
+        expected = await resp.json()
+
+    h["Accept"] = "application/msgpack"
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        assert resp.content_type == "application/msgpack"
+        assert resp.headers["Vary"] == "Accept"
+        # Not streamed, as MessagePack needs the length of the array first.
+        assert "Transfer-Encoding" not in resp.headers
+        assert msgpack.unpackb(await resp.read()) == expected
+
+    # The admin UI's header, large pages are streamed as JSON.
+    h["Accept"] = "application/msgpack, application/json;q=0.9"
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        assert resp.content_type == "application/json"
+        assert resp.headers["Vary"] == "Accept"
+        assert resp.headers["Transfer-Encoding"] == "chunked"
+        assert await resp.json() == expected
+
+    p["pagination"] = json.dumps({"page": 1, "perPage": 10})
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        assert resp.content_type == "application/msgpack"
+        assert msgpack.unpackb(await resp.read()) == expected
+
+    url = admin_client.app[admin].router["dummy2_update_many"].url_for()
+    p = {"ids": '["1"]', "data": json.dumps({"msg": "ABC"})}
+    async with admin_client.put(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        assert msgpack.unpackb(await resp.read()) == {"data": ["1"]}
+
+
+async def test_invalid_login_body(admin_client: _Client) -> None:
+    assert admin_client.app
+    url = admin_client.app[admin].router["token"].url_for()
+    async with admin_client.post(url, data="{") as resp:
+        assert resp.status == 400
@@ -1,12 +1,24 @@
+import asyncio
+import base64
 import json
+import threading
+import time
 from collections.abc import Awaitable, Callable
 from typing import Optional
 from unittest import mock
 
-from aiohttp import web
-from aiohttp.test_utils import TestClient
-
-from aiohttp_admin import Permissions, UserDetails
+import pytest
+from aiohttp import ClientResponse, web
+from aiohttp.test_utils import TestClient, make_mocked_request
+from cryptography.fernet import Fernet
+
+from _auth import check_credentials as check_credentials_default
+from aiohttp_admin import (PasswordVerifier, Permissions, UserDetails, hash_password,
+                           identity_cache_key, verify_password)
+from aiohttp_admin.security import (AdminAuthorizationPolicy, IdentityCache, LoginThrottle,
+                                    SignedToken, compile_permissions, has_permission,
+                                    permissions_as_dict)
+from aiohttp_admin.session import MemoryStorage
 from conftest import IdentityCallback, admin, db, model2
 
 _Client = TestClient[web.Request, web.Application]
@@ -991,3 +1003,401 @@ async def test_permission_filter_field_update_many2(
     async with admin_client.put(url, params=p, headers=h) as resp:
         assert resp.status == 200
         assert await resp.json() == {"data": ["1", "2"]}
+
+
+def test_compiled_permissions_match_has_permission() -> None:
+    permissions = ("admin.view", "~admin.dummy.id.*", "admin.dummy2.*|msg=\"Test\"|id=3",
+                   "admin.dummy2.msg.edit|id=1", "~admin.foreign.delete", Permissions.add)
+    compiled = compile_permissions(permissions)
+    p_dict = permissions_as_dict(permissions)
+
+    checks = ("admin.view", "admin.edit", "admin.add", "admin.dummy.view", "admin.dummy.id.view",
+              "admin.dummy2.view", "admin.dummy2.msg.edit", "admin.dummy2.id.delete",
+              "admin.foreign.delete", "admin.foreign.dummy.delete", Permissions.view)
+    records: tuple[Optional[dict[str, object]], ...] = (
+        None, {}, {"id": 1, "msg": "Test"}, {"id": 3, "msg": "Other"},
+        {"id": 2, "msg": None})
+    for p in checks:
+        for r in records:
+            assert compiled.permits(p, r) is has_permission(p, p_dict, r), (p, r)
+
+
+def test_compiled_permissions_cached() -> None:
+    first = compile_permissions(["admin.view", "admin.dummy.edit"])
+    assert compile_permissions(("admin.dummy.edit", "admin.view")) is first
+    assert compile_permissions(("admin.view",)) is not first
+    assert first.rule("admin.dummy.edit") == ()
+    assert first.rule("admin.dummy.delete") is None
+
+
+async def test_identity_cache_coalesces_lookups() -> None:
+    calls = 0
+
+    async def identity_callback(identity: str) -> UserDetails:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0)
+        return {"permissions": {f"admin.{identity}.view"}}
+
+    cache = IdentityCache(identity_callback)
+    results = await asyncio.gather(*(cache.get("dummy") for _ in range(5)), cache.get("foo"))
+
+    assert calls == 2
+    assert results[0] == {"permissions": {"admin.dummy.view"}}
+    assert results[-1] == {"permissions": {"admin.foo.view"}}
+    assert (cache.hits, cache.misses) == (4, 2)
+
+    # No TTL, so nothing is kept after the lookup completes.
+    await cache.get("dummy")
+    assert calls == 3
+
+
+async def test_identity_cache_ttl() -> None:
+    identity_callback = mock.AsyncMock(spec_set=(), return_value={"permissions": {"admin.*"}})
+    cache = IdentityCache(identity_callback, ttl=60, maxsize=2)
+
+    with mock.patch("aiohttp_admin.security.time.monotonic", return_value=1000):
+        await cache.get("a")
+        await cache.get("a")
+        assert identity_callback.await_count == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        await cache.get("b")
+        await cache.get("c")  # Evicts "a"
+        await cache.get("a")
+        assert identity_callback.await_count == 4
+
+        cache.invalidate("a")
+        await cache.get("a")
+        assert identity_callback.await_count == 5
+
+    with mock.patch("aiohttp_admin.security.time.monotonic", return_value=1061):
+        await cache.get("a")
+        assert identity_callback.await_count == 6
+
+    cache.invalidate()
+    await cache.get("a")
+    assert identity_callback.await_count == 7
+
+
+async def test_identity_cache_error_not_cached() -> None:
+    identity_callback = mock.AsyncMock(spec_set=(), side_effect=(ValueError, {"permissions": ()}))
+    cache = IdentityCache(identity_callback, ttl=60)
+
+    with pytest.raises(ValueError):
+        await cache.get("a")
+    assert await cache.get("a") == {"permissions": ()}
+
+
+async def test_identity_cache_shared(create_admin_client: _CreateClient, login: _Login) -> None:
+    identity_callback = mock.AsyncMock(spec_set=(), return_value={"permissions": {"admin.*"}})
+    admin_client = await create_admin_client(identity_callback)
+
+    assert admin_client.app
+    cache = admin_client.app[admin][identity_cache_key]
+    h = await login(admin_client)
+    assert cache.misses == 1
+
+    url = admin_client.app[admin].router["dummy2_get_one"].url_for()
+    async with admin_client.get(url, params={"id": "1"}, headers=h) as resp:
+        assert resp.status == 200
+    assert cache.misses == 2
+    assert identity_callback.await_count == 2
+
+
+def test_compiled_permissions_filter_fields() -> None:
+    permissions = compile_permissions(("admin.dummy2.*", "~admin.dummy2.secret.view",
+                                       "admin.dummy2.msg.view|id=1|id=2"))
+    records = ({"id": 1, "msg": "a", "secret": "x"}, {"id": 3, "msg": "b", "secret": "y"},
+               {"id": 2, "msg": "c"})
+
+    result = permissions.filter_fields("admin.dummy2", "view", records)
+    assert result == [{"id": 1, "msg": "a"}, {"id": 3}, {"id": 2, "msg": "c"}]
+
+    contexts: tuple[dict[str, object], ...] = ({"id": 3}, {"id": 2}, {})
+    result = permissions.filter_fields("admin.dummy2", "view", records, contexts)
+    assert result == [{"id": 1}, {"id": 3, "msg": "b"}, {"id": 2, "msg": "c"}]
+
+    result = permissions.filter_fields("admin.dummy2", "edit", records)
+    assert result == [dict(r) for r in records]
+
+
+def test_permits_many() -> None:
+    policy = AdminAuthorizationPolicy(IdentityCache())
+    request = make_mocked_request("GET", "/")
+    request["aiohttpadmin_permissions"] = compile_permissions(
+        ("admin.dummy2.*|id=1|id=2", "admin.dummy2.msg.edit|msg=\"Test\"", "~admin.dummy2.id.*"))
+
+    records = ({"id": 1, "msg": "Test"}, {"id": 2, "msg": "Test"})
+    assert policy.permits_many(request, "admin.dummy2.edit", records)
+    assert not policy.permits_many(request, "admin.dummy2.edit", (*records, {"id": 3}))
+    assert not policy.permits_many(request, "admin.dummy.edit", records)
+    assert policy.permits_many(request, "admin.dummy2.delete", ())
+
+    fields = ("admin.dummy2.edit", "admin.dummy2.msg.edit")
+    assert policy.permits_all(request, fields, records[0])
+    assert not policy.permits_all(request, fields, {"id": 1, "msg": "Other"})
+    assert not policy.permits_all(request, (*fields, "admin.dummy2.id.edit"), records[0])
+
+
+async def test_token_cache(create_admin_client: Callable[..., Awaitable[_Client]],
+                           login: _Login) -> None:
+    admin_client = await create_admin_client(token_cache_size=10, max_age=3600)
+
+    assert admin_client.app
+    url = admin_client.app[admin].router["dummy2_get_one"].url_for()
+    h = await login(admin_client)
+    with mock.patch("aiohttp_admin.security.Fernet.decrypt", autospec=True,
+                    side_effect=Fernet.decrypt) as decrypt:
+        async with admin_client.get(url, params={"id": "1"}, headers=h) as resp:
+            assert resp.status == 200
+        # Token and cookie are both decrypted.
+        assert decrypt.call_count == 2
+
+        async with admin_client.get(url, params={"id": "1"}, headers=h) as resp:
+            assert resp.status == 200
+        assert decrypt.call_count == 2
+
+    with mock.patch("aiohttp_admin.security.time.time", return_value=time.time() + 3601):
+        async with admin_client.get(url, params={"id": "1"}, headers=h) as resp:
+            assert resp.status == 401
+
+    logout_url = admin_client.app[admin].router["logout"].url_for()
+    async with admin_client.delete(logout_url, headers=h) as resp:
+        assert resp.status == 200
+    async with admin_client.get(url, params={"id": "1"}, headers=h) as resp:
+        assert resp.status == 401
+
+
+async def test_token_cache_logout(create_admin_client: Callable[..., Awaitable[_Client]],
+                                  login: _Login) -> None:
+    storage = MemoryStorage(secure=False)
+    admin_client = await create_admin_client(session_storage=storage, token_cache_size=10,
+                                             token_cache_ttl=5)
+
+    assert admin_client.app
+    url = admin_client.app[admin].router["dummy2_get_one"].url_for()
+    h = await login(admin_client)
+    async with admin_client.get(url, params={"id": "1"}, headers=h) as resp:
+        assert resp.status == 200
+
+    # Logged out elsewhere (e.g. by another worker sharing the storage).
+    cookie = admin_client.session.cookie_jar.filter_cookies(admin_client.make_url("/admin/"))
+    await storage.delete(cookie["AIOHTTP_SESSION"].value)
+    async with admin_client.get(url, params={"id": "1"}, headers=h) as resp:
+        assert resp.status == 200
+
+    # The cached token expires, even though the token itself doesn't (max_age=None).
+    with mock.patch("aiohttp_admin.security.time.time", return_value=time.time() + 6):
+        async with admin_client.get(url, params={"id": "1"}, headers=h) as resp:
+            assert resp.status == 401
+
+
+def test_signed_token() -> None:
+    old = SignedToken((b"old",))
+    new = SignedToken((b"new", b"old"))
+
+    token = old.dumps("admin.user")
+    assert token.count(".") == 3
+    assert old.loads(token, None) == ("admin.user", mock.ANY)
+    assert new.loads(token, 60) == ("admin.user", mock.ANY)
+    assert old.loads(new.dumps("admin"), None) is None
+    assert new.loads(new.dumps("admin"), None) == ("admin", mock.ANY)
+
+    key_id, created, data, signature = token.split(".")
+    forged = f"{key_id}.{created}.{data[:-1]}A.{signature}"
+    assert old.loads(forged, None) is None
+    assert old.loads("invalid", None) is None
+    assert old.loads(f"{key_id}.{int(created) - 61}.{data}.{signature}", 60) is None
+
+    with mock.patch("aiohttp_admin.security.time.time", return_value=int(created) + 61):
+        assert old.loads(token, 60) is None
+
+
+async def test_signed_token_login(create_admin_client: Callable[..., Awaitable[_Client]],
+                                  login: _Login) -> None:
+    admin_client = await create_admin_client(token_format="signed")
+
+    assert admin_client.app
+    h = await login(admin_client)
+    auth = json.loads(h["Authorization"])["auth"]
+    assert base64.urlsafe_b64decode(auth.split(".")[2] + "==") == b"admin"
+
+    url = admin_client.app[admin].router["dummy2_get_one"].url_for()
+    async with admin_client.get(url, params={"id": "1"}, headers=h) as resp:
+        assert resp.status == 200
+
+    identity = json.loads(h["Authorization"])
+    identity["auth"] = SignedToken((b"other",)).dumps("admin")
+    h = {"Authorization": json.dumps(identity)}
+    async with admin_client.get(url, params={"id": "1"}, headers=h) as resp:
+        assert resp.status == 401
+
+
+async def test_permission_claims(create_admin_client: Callable[..., Awaitable[_Client]],
+                                 login: _Login) -> None:
+    identity_callback = mock.AsyncMock(spec_set=(), return_value={
+        "permissions": {"admin.*": {}}})
+    admin_client = await create_admin_client(identity_callback, permission_claims_ttl=60)
+
+    assert admin_client.app
+    h = await login(admin_client)
+    assert "claims" in json.loads(h["Authorization"])
+    calls = identity_callback.await_count
+
+    url = admin_client.app[admin].router["dummy2_get_one"].url_for()
+    async with admin_client.get(url, params={"id": "1"}, headers=h) as resp:
+        assert resp.status == 200
+    assert identity_callback.await_count == calls
+
+    with mock.patch("aiohttp_admin.security.time.time", return_value=time.time() + 61):
+        async with admin_client.get(url, params={"id": "1"}, headers=h) as resp:
+            assert resp.status == 200
+            claims = resp.headers["X-Claims"]
+        assert identity_callback.await_count == calls + 1
+
+        # The re-issued claims are trusted again.
+        identity = json.loads(h["Authorization"])
+        identity["claims"] = claims
+        h = {"Authorization": json.dumps(identity)}
+        async with admin_client.get(url, params={"id": "1"}, headers=h) as resp:
+            assert resp.status == 200
+            assert "X-Claims" not in resp.headers
+        assert identity_callback.await_count == calls + 1
+
+
+def test_hash_password() -> None:
+    hashed = hash_password("secret", iterations=1000)
+    assert hashed.startswith("pbkdf2_sha256$1000$")
+    assert hashed != hash_password("secret", iterations=1000)
+    assert verify_password("secret", hashed)
+    assert not verify_password("Secret", hashed)
+    assert not verify_password("secret", "invalid")
+    assert not verify_password("secret", "md5$1$abc$def")
+
+
+async def test_password_verifier_concurrency() -> None:
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def verify(password: str, hashed: str) -> bool:
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.01)
+        with lock:
+            running -= 1
+        return password == hashed
+
+    verifier = PasswordVerifier(verify, max_concurrency=2)
+    results = await asyncio.gather(*(verifier("a", h) for h in "abababab"))
+    assert results == [True, False] * 4
+    assert peak == 2
+
+
+def test_password_verifier_outside_loop() -> None:
+    def verify(password: str, hashed: str) -> bool:
+        time.sleep(0.01)
+        return password == hashed
+
+    # Created outside of any event loop, like a module-level verifier.
+    verifier = PasswordVerifier(verify, max_concurrency=1)
+
+    async def check() -> list[bool]:
+        return await asyncio.gather(*(verifier("a", h) for h in "aba"))
+
+    assert asyncio.run(check()) == [True, False, True]
+    assert asyncio.run(check()) == [True, False, True]
+
+
+async def _login(admin_client: _Client, username: str, password: str) -> ClientResponse:
+    assert admin_client.app
+    url = admin_client.app[admin].router["token"].url_for()
+    login = {"username": username, "password": password}
+    async with admin_client.post(url, json=login) as resp:
+        return resp
+
+
+async def test_login_throttle_username(
+        create_admin_client: Callable[..., Awaitable[_Client]]) -> None:
+    check_credentials = mock.AsyncMock(spec_set=(), side_effect=check_credentials_default)
+    with mock.patch("conftest.check_credentials", check_credentials):
+        admin_client = await create_admin_client(max_login_attempts=2,
+                                                 login_attempts_window=60)
+
+    assert (await _login(admin_client, "admin", "wrong")).status == 401
+    assert (await _login(admin_client, "admin", "wrong")).status == 401
+    resp = await _login(admin_client, "admin", "admin123")
+    assert resp.status == 429
+    assert 0 < int(resp.headers["Retry-After"]) <= 60
+    assert check_credentials.await_count == 2
+    # Other users are unaffected.
+    assert (await _login(admin_client, "other", "wrong")).status == 401
+
+    with mock.patch("aiohttp_admin.security.time.monotonic",
+                    return_value=time.monotonic() + 61):
+        assert (await _login(admin_client, "admin", "admin123")).status == 200
+        assert (await _login(admin_client, "admin", "wrong")).status == 401
+        assert (await _login(admin_client, "admin", "wrong")).status == 401
+
+
+async def test_login_throttle_success_resets(
+        create_admin_client: Callable[..., Awaitable[_Client]]) -> None:
+    admin_client = await create_admin_client(max_login_attempts=2)
+
+    assert (await _login(admin_client, "admin", "wrong")).status == 401
+    assert (await _login(admin_client, "admin", "admin123")).status == 200
+    assert (await _login(admin_client, "admin", "wrong")).status == 401
+    assert (await _login(admin_client, "admin", "admin123")).status == 200
+
+
+async def test_login_throttle_ip(create_admin_client: Callable[..., Awaitable[_Client]]) -> None:
+    admin_client = await create_admin_client(max_login_attempts=0,
+                                             max_login_attempts_per_ip=2)
+
+    assert (await _login(admin_client, "a", "wrong")).status == 401
+    assert (await _login(admin_client, "b", "wrong")).status == 401
+    assert (await _login(admin_client, "admin", "admin123")).status == 429
+
+
+async def test_login_throttle_concurrent(
+        create_admin_client: Callable[..., Awaitable[_Client]]) -> None:
+    started = 0
+    release = asyncio.Event()
+
+    async def slow_check(username: str, password: str) -> bool:
+        nonlocal started
+        started += 1
+        await release.wait()
+        return False
+
+    with mock.patch("conftest.check_credentials", slow_check):
+        admin_client = await create_admin_client(max_login_attempts=2)
+
+    tasks = [asyncio.create_task(_login(admin_client, "admin", "wrong")) for _ in range(5)]
+    while sum(t.done() for t in tasks) < 3:
+        await asyncio.sleep(0.01)
+    release.set()
+    statuses = sorted([(await t).status for t in tasks])
+    assert statuses == [401, 401, 429, 429, 429]
+    # Only the allowed attempts paid for checking the credentials.
+    assert started == 2
+
+
+async def test_login_throttle_disabled(admin_client: _Client) -> None:
+    for _ in range(20):
+        assert (await _login(admin_client, "admin", "wrong")).status == 401
+    assert (await _login(admin_client, "admin", "admin123")).status == 200
+
+
+def test_login_throttle_ip_release() -> None:
+    throttle = LoginThrottle(per_username=0, per_ip=2, window=60)
+    assert throttle.attempt("a", "1.2.3.4") == 0
+    throttle.succeeded("a", "1.2.3.4")
+    assert throttle.attempt("b", "1.2.3.4") == 0
+    assert throttle.attempt("c", "1.2.3.4") == 0
+    # Successful logins don't count towards the IP limit, failed ones do.
+    assert throttle.attempt("d", "1.2.3.4") > 0
+    assert throttle.attempt("d", "5.6.7.8") == 0
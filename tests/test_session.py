@@ -0,0 +1,118 @@
+import asyncio
+import sqlite3
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient
+
+from aiohttp_admin.session import MemoryStorage, SQLiteStorage, ServerSideStorage
+from conftest import admin
+
+_Client = TestClient[web.Request, web.Application]
+_Login = Callable[[_Client], Awaitable[dict[str, str]]]
+
+
+@pytest.fixture(params=("memory", "sqlite"))
+def storage(request: pytest.FixtureRequest, tmp_path: Path) -> ServerSideStorage:
+    if request.param == "memory":
+        return MemoryStorage(secure=False)
+    s = SQLiteStorage(tmp_path / "sessions.db", secure=False)
+    request.addfinalizer(s.close)
+    return s
+
+
+async def test_login_logout(create_admin_client: Callable[..., Awaitable[_Client]],
+                            login: _Login, storage: ServerSideStorage) -> None:
+    admin_client = await create_admin_client(session_storage=storage)
+
+    assert admin_client.app
+    h = await login(admin_client)
+    cookie = admin_client.session.cookie_jar.filter_cookies(admin_client.make_url("/admin/"))
+    key = cookie["AIOHTTP_SESSION"].value
+    assert await storage.load(key) is not None
+
+    url = admin_client.app[admin].router["dummy_get_one"].url_for()
+    async with admin_client.get(url, params={"id": "1"}, headers=h) as resp:
+        assert resp.status == 200
+
+    logout_url = admin_client.app[admin].router["logout"].url_for()
+    async with admin_client.delete(logout_url, headers=h) as resp:
+        assert resp.status == 200
+    assert await storage.load(key) is None
+
+    admin_client.session.cookie_jar.update_cookies({"AIOHTTP_SESSION": key})
+    async with admin_client.get(url, params={"id": "1"}, headers=h) as resp:
+        assert resp.status == 401
+
+
+async def test_expiry(storage: ServerSideStorage) -> None:
+    await storage.save("a", "data", 60)
+    await storage.save("b", "data", None)
+    assert await storage.load("a") == "data"
+
+    with mock.patch("aiohttp_admin.session.time.time", return_value=time.time() + 61):
+        assert await storage.load("a") is None
+        assert await storage.load("b") == "data"
+
+
+async def test_memory_lru() -> None:
+    storage = MemoryStorage(maxsize=2)
+    await storage.save("a", "1", None)
+    await storage.save("b", "2", None)
+    assert await storage.load("a") == "1"
+    await storage.save("c", "3", None)
+
+    assert await storage.load("a") == "1"
+    assert await storage.load("b") is None
+    assert await storage.load("c") == "3"
+
+
+async def test_sqlite_shared(tmp_path: Path) -> None:
+    path = tmp_path / "sessions.db"
+    first = SQLiteStorage(path)
+    second = SQLiteStorage(path)
+    try:
+        await first.save("key", "data", None)
+        assert await second.load("key") == "data"
+        await second.delete("key")
+        assert await first.load("key") is None
+    finally:
+        first.close()
+        second.close()
+
+
+async def test_session_ttl(create_admin_client: Callable[..., Awaitable[_Client]],
+                           login: _Login, storage: ServerSideStorage) -> None:
+    storage._session_ttl = 60
+    admin_client = await create_admin_client(session_storage=storage)
+
+    await login(admin_client)
+    cookie = admin_client.session.cookie_jar.filter_cookies(admin_client.make_url("/admin/"))
+    key = cookie["AIOHTTP_SESSION"].value
+    assert await storage.load(key) is not None
+
+    with mock.patch("aiohttp_admin.session.time.time", return_value=time.time() + 61):
+        assert await storage.load(key) is None
+
+
+async def test_sqlite_locked(tmp_path: Path) -> None:
+    path = tmp_path / "sessions.db"
+    storage = SQLiteStorage(path)
+    try:
+        await storage.delete("key")
+        conn = sqlite3.connect(path, isolation_level=None)
+        conn.execute("BEGIN IMMEDIATE")
+        task = asyncio.create_task(storage.save("key", "data", None))
+        # The event loop keeps running while the write waits for the lock.
+        await asyncio.sleep(0.1)
+        assert not task.done()
+        conn.execute("COMMIT")
+        conn.close()
+        await task
+        assert await storage.load("key") == "data"
+    finally:
+        storage.close()
@@ -1,13 +1,21 @@
+import asyncio
 import json
 import re
+import secrets
 from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Optional
+from unittest import mock
 
 import pytest
 import sqlalchemy as sa
 from aiohttp import web
 from aiohttp.test_utils import TestClient
 
-from aiohttp_admin.types import comp, data, func
+from aiohttp_admin.backends.abc import encode_cursor
+from aiohttp_admin.backends.sqlalchemy import SAResource
+from aiohttp_admin.routes import load_static_assets
+from aiohttp_admin.types import comp, data, func, resources_key, state_key
 from conftest import admin, db, model, model2
 
 _Client = TestClient[web.Request, web.Application]
@@ -47,6 +55,38 @@ async def test_admin_view(admin_client: _Client) -> None:
     assert state["urls"] == {"token": "/admin/token", "logout": "/admin/logout"}
 
 
+async def test_admin_view_cached(admin_client: _Client) -> None:
+    assert admin_client.app
+    url = admin_client.app[admin].router["index"].url_for()
+    h = {"Accept-Encoding": "gzip"}
+    async with admin_client.get(url, headers=h) as resp:
+        assert resp.status == 200
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert resp.headers["Vary"] == "Accept-Encoding"
+        etag = resp.headers["ETag"]
+        html = await resp.text()
+
+    async with admin_client.get(url, headers=h | {"If-None-Match": etag}) as resp:
+        assert resp.status == 304
+        assert resp.headers["ETag"] == etag
+
+    h = {"Accept-Encoding": "gzip;q=0, identity"}
+    async with admin_client.get(url, headers=h | {"If-None-Match": etag}) as resp:
+        assert resp.status == 200
+        assert "Content-Encoding" not in resp.headers
+        # Not duplicated by the compression middleware.
+        assert resp.headers.getall("Vary") == ["Accept-Encoding"]
+        assert resp.headers["ETag"] != etag
+        assert await resp.text() == html
+
+    # Changes to the state after startup are rendered automatically.
+    admin_client.app[admin][state_key]["view"]["name"] = "Changed"
+    async with admin_client.get(url, headers={"If-None-Match": etag}) as resp:
+        assert resp.status == 200
+        assert resp.headers["ETag"] != etag
+        assert "<title>Changed Admin</title>" in await resp.text()
+
+
 async def test_list_pagination(admin_client: _Client, login: _Login) -> None:
     h = await login(admin_client)
     assert admin_client.app
@@ -80,6 +120,119 @@ async def test_list_pagination(admin_client: _Client, login: _Login) -> None:
         assert page["total"] == 26
 
 
+async def test_list_streamed(admin_client: _Client, login: _Login) -> None:
+    h = await login(admin_client)
+    assert admin_client.app
+    async with admin_client.app[db].begin() as sess:
+        for _ in range(1199):
+            sess.add(admin_client.app[model]())
+
+    url = admin_client.app[admin].router["dummy_get_list"].url_for()
+    p = {"pagination": '{"page": 1, "perPage": 1000}',
+         "sort": '{"field": "id", "order": "DESC"}', "filter": '{}'}
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        assert resp.headers["Transfer-Encoding"] == "chunked"
+        page = await resp.json()
+        assert page["total"] == 1200
+        assert tuple(r["id"] for r in page["data"]) == tuple(str(i) for i in range(1200, 200, -1))
+
+    p = {"pagination": '{"page": 2, "perPage": 1000}',
+         "sort": '{"field": "id", "order": "DESC"}', "filter": '{}'}
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        page = await resp.json()
+        assert page["total"] == 1200
+        assert tuple(r["id"] for r in page["data"]) == tuple(str(i) for i in range(200, 0, -1))
+
+    p = {"pagination": '{"page": 3, "perPage": 1000}',
+         "sort": '{"field": "id", "order": "DESC"}', "filter": '{}'}
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        assert await resp.json() == {"data": [], "total": 1200}
+
+
+async def test_list_streamed_disconnect(admin_client: _Client, login: _Login) -> None:
+    h = await login(admin_client)
+    assert admin_client.app
+    async with admin_client.app[db].begin() as sess:
+        for _ in range(1000):
+            sess.add(admin_client.app[model2](msg=secrets.token_hex(1000)))
+
+    # Small chunks, so the client is likely to disconnect during a query.
+    admin_client.app[admin][resources_key]["dummy2"].stream_chunk_size = 1
+    url = admin_client.app[admin].router["dummy2_get_list"].url_for()
+    p = {"pagination": '{"page": 1, "perPage": 1000}',
+         "sort": '{"field": "id", "order": "ASC"}', "filter": '{}'}
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        await resp.content.readexactly(1000)
+        # Drop the connection partway through the stream.
+        resp.close()
+    await asyncio.sleep(0.2)
+
+    # The database connection was returned to the pool, rather than discarded.
+    p["pagination"] = '{"page": 1, "perPage": 5}'
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        assert (await resp.json())["total"] == 1003
+
+
+async def test_list_compressed(create_admin_client: Callable[..., Awaitable[_Client]],
+                               login: _Login) -> None:
+    compression = {"min_size": 1000, "level": 1, "executor_size": 4000}
+    admin_client = await create_admin_client(extra_schema={"compression": compression})
+    h = await login(admin_client)
+    assert admin_client.app
+    url = admin_client.app[admin].router["dummy_get_list"].url_for()
+    p = {"pagination": '{"page": 1, "perPage": 5}',
+         "sort": '{"field": "id", "order": "ASC"}', "filter": '{}'}
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        assert "Content-Encoding" not in resp.headers
+
+    async with admin_client.app[db].begin() as sess:
+        for _ in range(199):
+            sess.add(admin_client.app[model]())
+
+    # Compressed in the event loop, then in an executor.
+    for per_page in (100, 200):
+        p["pagination"] = json.dumps({"page": 1, "perPage": per_page})
+        async with admin_client.get(url, params=p, headers=h) as resp:
+            assert resp.status == 200
+            assert resp.headers["Content-Encoding"] == "gzip"
+            assert resp.headers.getall("Vary") == ["Accept", "Accept-Encoding"]
+            assert len((await resp.json())["data"]) == per_page
+
+    async with admin_client.get(url, params=p, headers=h | {"Accept-Encoding": "br"}) as resp:
+        assert resp.status == 200
+        assert "Content-Encoding" not in resp.headers
+        assert resp.headers.getall("Vary") == ["Accept", "Accept-Encoding"]
+
+    p["pagination"] = '{"page": 1, "perPage": 1000}'
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        assert resp.headers["Content-Encoding"] in ("gzip", "deflate")
+        assert len((await resp.json())["data"]) == 200
+
+
+async def test_list_compression_disabled(
+        create_admin_client: Callable[..., Awaitable[_Client]], login: _Login) -> None:
+    admin_client = await create_admin_client(extra_schema={"compression": None})
+    h = await login(admin_client)
+    assert admin_client.app
+    async with admin_client.app[db].begin() as sess:
+        for _ in range(99):
+            sess.add(admin_client.app[model]())
+
+    url = admin_client.app[admin].router["dummy_get_list"].url_for()
+    p = {"pagination": '{"page": 1, "perPage": 1000}',
+         "sort": '{"field": "id", "order": "ASC"}', "filter": '{}'}
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        assert "Content-Encoding" not in resp.headers
+
+
 async def test_list_filtering_by_pk(admin_client: _Client, login: _Login) -> None:
     h = await login(admin_client)
     assert admin_client.app
@@ -122,6 +275,27 @@ async def test_get_one(admin_client: _Client, login: _Login) -> None:
         assert await resp.json() == {"data": {"id": "1", "fk_id": "1", "data": {"id": 1}}}
 
 
+async def test_get_one_etag(admin_client: _Client, login: _Login) -> None:
+    h = await login(admin_client)
+    assert admin_client.app
+    url = admin_client.app[admin].router["dummy_get_one"].url_for()
+
+    async with admin_client.get(url, params={"id": 1}, headers=h) as resp:
+        assert resp.status == 200
+        etag = resp.headers["ETag"]
+        assert etag.startswith('W/"')
+
+    async with admin_client.get(url, params={"id": 1},
+                                headers={**h, "If-None-Match": etag}) as resp:
+        assert resp.status == 304
+        assert resp.headers["ETag"] == etag
+
+    async with admin_client.get(url, params={"id": 1},
+                                headers={**h, "If-None-Match": 'W/"other"'}) as resp:
+        assert resp.status == 200
+        assert resp.headers["ETag"] == etag
+
+
 async def test_get_one_not_exists(admin_client: _Client, login: _Login) -> None:
     h = await login(admin_client)
     assert admin_client.app
@@ -195,6 +369,46 @@ async def test_get_many_ref_orm(admin_client: _Client, login: _Login) -> None:
         assert await resp.json() == {"data": [expected_record], "total": 1}
 
 
+async def test_list_columns(admin_client: _Client, login: _Login) -> None:
+    h = await login(admin_client)
+    assert admin_client.app
+    async with admin_client.app[db].begin() as sess:
+        for _ in range(1000):
+            sess.add(admin_client.app[model]())
+
+    url = admin_client.app[admin].router["dummy_get_list"].url_for()
+    p = {"pagination": '{"page": 1, "perPage": 3}', "sort": '{"field": "id", "order": "ASC"}',
+         "filter": '{}', "format": "columns"}
+    expected = {"fields": ["id"], "primaryKey": ["id"], "foreignKeys": [["id"]]}
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        assert await resp.json() == {**expected, "rows": [[1], [2], [3]], "total": 1001,
+                                     "cursor": encode_cursor("id", 3, (3,))}
+
+    p["pagination"] = '{"page": 2, "perPage": 501}'
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        assert resp.headers["Transfer-Encoding"] == "chunked"
+        page = await resp.json()
+        assert page.keys() == {"fields", "primaryKey", "foreignKeys", "rows", "total"}
+        assert page["fields"] == ["id"]
+        assert page["rows"] == [[i] for i in range(502, 1002)]
+
+    p["pagination"] = '{"page": 3, "perPage": 501}'
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        assert await resp.json() == {**expected, "fields": [], "rows": [], "total": 1001}
+
+    url = admin_client.app[admin].router["foreign_get_many_ref"].url_for()
+    p = {"target": "dummy", "id": "1", "pagination": '{"page": 1, "perPage": 10}',
+         "sort": '{"field": "id", "order": "DESC"}', "filter": "{}", "format": "columns"}
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200, await resp.text()
+        assert await resp.json() == {"fields": ["id", "dummy"], "primaryKey": ["id"],
+                                     "foreignKeys": [["dummy"]], "rows": [[1, 1]],
+                                     "total": 1}
+
+
 async def test_create(admin_client: _Client, login: _Login) -> None:
     h = await login(admin_client)
     assert admin_client.app
@@ -277,6 +491,44 @@ async def test_update_many(admin_client: _Client, login: _Login) -> None:
         assert r.msg == "ABC"
 
 
+async def test_json_body(admin_client: _Client, login: _Login) -> None:
+    h = await login(admin_client)
+    assert admin_client.app
+    url = admin_client.app[admin].router["dummy2_create"].url_for()
+    body: dict[str, object] = {"data": {"data": {"msg": "ABC"}}}
+    async with admin_client.post(url, json=body, headers=h) as resp:
+        assert resp.status == 200
+        assert await resp.json() == {"data": {"id": "4", "data": {"id": 4, "msg": "ABC"}}}
+
+    url = admin_client.app[admin].router["dummy2_update"].url_for()
+    body = {"id": "4", "data": {"id": "4", "data": {"msg": "DEF"}},
+            "previousData": {"id": "4", "data": {"id": 4, "msg": "ABC"}}}
+    async with admin_client.put(url, json=body, headers=h) as resp:
+        assert resp.status == 200
+        assert await resp.json() == {"data": {"id": "4", "data": {"id": 4, "msg": "DEF"}}}
+
+    url = admin_client.app[admin].router["dummy2_update_many"].url_for()
+    body = {"ids": ["1", "4"], "data": {"msg": "x" * 10000}}
+    async with admin_client.put(url, json=body, headers=h) as resp:
+        assert resp.status == 200
+        assert await resp.json() == {"data": ["1", "4"]}
+
+    async with admin_client.app[db]() as sess:
+        r = await sess.get(admin_client.app[model2], 4)
+        assert r is not None
+        assert r.msg == "x" * 10000
+
+    body = {"ids": ["1"], "data": {"msg": "x" * 1000}}
+    with mock.patch.object(SAResource, "max_body_size", 1000):
+        async with admin_client.put(url, json=body, headers=h) as resp:
+            assert resp.status == 413
+
+    async with admin_client.put(url, data="{", headers={**h, "Content-Type": "application/json"}
+                                ) as resp:
+        assert resp.status == 400
+        assert await resp.text() == "Invalid JSON"
+
+
 async def test_update_many_deleted_entity(admin_client: _Client, login: _Login) -> None:
     h = await login(admin_client)
     assert admin_client.app
@@ -367,3 +619,154 @@ async def test_delete_many_not_exists(admin_client: _Client, login: _Login) -> N
     async with admin_client.app[db]() as sess:
         r = await sess.scalars(sa.select(admin_client.app[model]))
         assert len(r.all()) == 4
+
+
+def test_load_static_assets(tmp_path: Path) -> None:
+    assert load_static_assets(tmp_path) == {"entry": "admin.js", "hashed": frozenset()}
+
+    (tmp_path / ".vite").mkdir()
+    manifest = {"src/admin.jsx": {"file": "admin-Ab12.js", "isEntry": True,
+                                  "css": ["admin-Cd34.css"]}}
+    (tmp_path / ".vite" / "manifest.json").write_text(json.dumps(manifest))
+    assert load_static_assets(tmp_path) == {
+        "entry": "admin-Ab12.js",
+        "hashed": {"admin-Ab12.js", "admin-Ab12.js.map", "admin-Cd34.css", "admin-Cd34.css.map"}}
+
+
+async def test_static_cache_headers(
+        create_admin_client: Callable[..., Awaitable[_Client]]) -> None:
+    assets = {"entry": "favicon.svg", "hashed": frozenset(("favicon.svg",))}
+    with mock.patch("aiohttp_admin.routes.load_static_assets", return_value=assets):
+        admin_client = await create_admin_client()
+
+    assert admin_client.app
+    async with admin_client.get(admin_client.app[admin].router["index"].url_for()) as resp:
+        assert '<script src="/admin/static/favicon.svg"' in await resp.text()
+
+    url = admin_client.app[admin].router["static"].url_for(filename="favicon.svg")
+    async with admin_client.get(url) as resp:
+        assert resp.status == 200
+        assert resp.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+
+    async with admin_client.get(admin_client.app[admin].router["index"].url_for()) as resp:
+        assert resp.headers["Cache-Control"] == "no-cache"
+
+
+async def test_list_cursor(admin_client: _Client, login: _Login) -> None:
+    h = await login(admin_client)
+    assert admin_client.app
+    async with admin_client.app[db].begin() as sess:
+        for i in range(30):
+            sess.add(admin_client.app[model2](msg=f"m{i % 4}"))
+
+    url = admin_client.app[admin].router["dummy2_get_list"].url_for()
+    for order in ("ASC", "DESC"):
+        p = {"pagination": '{"page": 1, "perPage": 33}',
+             "sort": json.dumps({"field": "msg", "order": order}), "filter": "{}"}
+        async with admin_client.get(url, params=p, headers=h) as resp:
+            assert resp.status == 200
+            expected = [r["id"] for r in (await resp.json())["data"]]
+            assert len(expected) == 33
+
+        p["pagination"] = '{"page": 1, "perPage": 7}'
+        ids: list[str] = []
+        for page in range(1, 6):
+            async with admin_client.get(url, params=p, headers=h) as resp:
+                assert resp.status == 200
+                result = await resp.json()
+            assert result["total"] == 33
+            ids.extend(r["id"] for r in result["data"])
+            if page < 5:
+                p["cursor"] = result["cursor"]
+                # The page number is ignored when a cursor is given.
+                p["pagination"] = json.dumps({"page": page + 5, "perPage": 7})
+            else:
+                assert len(result["data"]) == 5
+                assert "cursor" not in result
+        assert ids == expected
+
+    p = {"pagination": '{"page": 1, "perPage": 7}',
+         "sort": '{"field": "id", "order": "ASC"}', "filter": "{}",
+         "cursor": encode_cursor("msg", "m1", (3,))}
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 400
+        assert "Cursor does not match" in await resp.text()
+
+    p["cursor"] = "invalid"
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 400
+
+
+async def test_list_cursor_nulls(admin_client: _Client, login: _Login) -> None:
+    h = await login(admin_client)
+    assert admin_client.app
+    async with admin_client.app[db].begin() as sess:
+        for i in range(8):
+            sess.add(admin_client.app[model2](msg=None if i % 3 else f"m{i}"))
+
+    url = admin_client.app[admin].router["dummy2_get_list"].url_for()
+    for order in ("ASC", "DESC"):
+        p = {"pagination": '{"page": 1, "perPage": 11}',
+             "sort": json.dumps({"field": "msg", "order": order}), "filter": "{}"}
+        async with admin_client.get(url, params=p, headers=h) as resp:
+            expected = [r["data"]["msg"] for r in (await resp.json())["data"]]
+        # The database's default null ordering is unchanged (lowest in SQLite).
+        nulls = expected[:5] if order == "ASC" else expected[-5:]
+        assert nulls == [None] * 5
+        assert expected.count(None) == 5
+
+        p["pagination"] = '{"page": 1, "perPage": 3}'
+        msgs: list[Optional[str]] = []
+        for page in range(2, 6):
+            async with admin_client.get(url, params=p, headers=h) as resp:
+                assert resp.status == 200
+                result = await resp.json()
+            msgs.extend(r["data"]["msg"] for r in result["data"])
+            p.pop("cursor", None)
+            if len(result["data"]) == 3:
+                # Cursors are issued after null values too.
+                p["cursor"] = result["cursor"]
+            p["pagination"] = json.dumps({"page": page, "perPage": 3})
+        assert msgs == expected
+
+
+async def test_get_count(admin_client: _Client, login: _Login) -> None:
+    h = await login(admin_client)
+    assert admin_client.app
+    async with admin_client.app[db].begin() as sess:
+        for i in range(12):
+            sess.add(admin_client.app[model2](msg=f"m{i % 2}"))
+
+    url = admin_client.app[admin].router["dummy2_get_list"].url_for()
+    p = {"pagination": '{"page": 1, "perPage": 5}',
+         "sort": '{"field": "id", "order": "ASC"}', "filter": '{"msg": "m1"}',
+         "count": "false"}
+    async with admin_client.get(url, params=p, headers=h) as resp:
+        assert resp.status == 200
+        result = await resp.json()
+        assert [r["id"] for r in result["data"]] == ["5", "7", "9", "11", "13"]
+        assert result["pageInfo"] == {"hasNextPage": True, "hasPreviousPage": False}
+        assert "total" not in result
+
+    url = admin_client.app[admin].router["dummy2_get_count"].url_for()
+    async with admin_client.get(url, params={"filter": '{"msg": "m1"}'}, headers=h) as resp:
+        assert resp.status == 200
+        assert await resp.json() == {"total": 6}
+        assert "Cache-Control" not in resp.headers
+        etag = resp.headers["ETag"]
+
+    async with admin_client.get(url, params={"filter": '{"msg": "m1"}'},
+                                headers={**h, "If-None-Match": etag}) as resp:
+        assert resp.status == 304
+
+    async with admin_client.get(url, params={"filter": "{}"}, headers=h) as resp:
+        assert resp.status == 200
+        assert await resp.json() == {"total": 15}
+
+    async with admin_client.get(url, params={"filter": '{"foo": 1}'}, headers=h) as resp:
+        assert resp.status == 400
+
+    with mock.patch.object(SAResource, "count_max_age", 10):
+        async with admin_client.get(url, params={"filter": "{}"}, headers=h) as resp:
+            assert resp.status == 200
+            assert resp.headers["Cache-Control"] == "private, max-age=10"